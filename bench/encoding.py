@@ -0,0 +1,86 @@
+# bench/encoding.py
+# So sánh chi phí CPU khi mã hóa JSON và số byte gửi đi (không nén / gzip / brotli)
+# cho các payload danh mục lớn. Không cần server, chạy trực tiếp:
+#   python -m bench.encoding --iterations 200 --images 10
+import argparse
+import os
+import sys
+import time
+import zlib
+from typing import Any, Callable, Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _accommodations_payload(count: int) -> List[Dict[str, Any]]:
+    from bench import fakes
+    from routers.accommodation import _process_accommodation_data
+
+    built: Dict[Any, Dict[str, Any]] = {}
+    raw = [fakes._accommodation(i) for i in range(count)]
+    return [_process_accommodation_data(item, fakes.ROOM_TYPES, built) for item in raw]
+
+
+def _utilities_payload(count: int, images: int) -> List[Dict[str, Any]]:
+    return [
+        {
+            "id": i,
+            "type": "spa",
+            "images": [f"https://example.com/utilities/{i}/{j}.jpg" for j in range(images)],
+            "title": f"Tiện ích {i}",
+            "description": "Mô tả tiện ích " * 10,
+            "vr360_url": f"https://example.com/vr/{i}",
+            "video_url": f"https://example.com/video/{i}.mp4",
+        }
+        for i in range(1, count + 1)
+    ]
+
+
+def _time(fn: Callable[[], Any], iterations: int) -> float:
+    started = time.process_time()
+    for _ in range(iterations):
+        fn()
+    return (time.process_time() - started) / iterations * 1000
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark mã hóa JSON và nén response")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--accommodations", type=int, default=100)
+    parser.add_argument("--utilities", type=int, default=500)
+    parser.add_argument("--images", type=int, default=10, help="số ảnh mỗi loại phòng / tiện ích")
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault("FAKE_IMAGES", str(args.images))
+    os.environ.setdefault("FAKE_ACCOMMODATIONS", str(args.accommodations))
+    sys.path.insert(0, ROOT)
+
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+    from routers import compression, responses
+
+    payloads = {
+        "accommodations": _accommodations_payload(args.accommodations),
+        "utilities": _utilities_payload(args.utilities, args.images),
+    }
+    print(f"orjson: {'có' if responses.orjson else 'không'}, brotli: {'có' if compression.brotli else 'không'}")
+    print(f"{'payload':<16}{'default ms':>12}{'fast ms':>10}{'raw KB':>10}{'gzip KB':>10}{'br KB':>10}{'gzip ms':>10}")
+    for name, data in payloads.items():
+        # Đường mặc định của FastAPI: jsonable_encoder rồi JSONResponse.render
+        default_ms = _time(lambda: JSONResponse(jsonable_encoder(data)).body, args.iterations)
+        fast_ms = _time(lambda: responses.FastJSONResponse(data).body, args.iterations)
+
+        body = responses.dumps(data)
+        gzip_body = zlib.compress(body, compression.COMPRESSION_GZIP_LEVEL)
+        gzip_ms = _time(lambda: compression._Compressor("gzip").finish(body), max(1, args.iterations // 4))
+        br_kb = "-"
+        if compression.brotli is not None:
+            br_kb = f"{len(compression._Compressor('br').finish(body)) / 1024:.1f}"
+        print(
+            f"{name:<16}{default_ms:>12.2f}{fast_ms:>10.2f}{len(body) / 1024:>10.1f}"
+            f"{len(gzip_body) / 1024:>10.1f}{br_kb:>10}{gzip_ms:>10.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
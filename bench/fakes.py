@@ -0,0 +1,163 @@
+# bench/fakes.py
+# Server giả lập WordPress MPHB và Zalo Graph API cho benchmark (chạy offline).
+# Cấu hình qua biến môi trường:
+#   FAKE_LATENCY_MS       độ trễ cố định mỗi request (mặc định 50)
+#   FAKE_JITTER_MS        độ trễ ngẫu nhiên cộng thêm tối đa (mặc định 0)
+#   FAKE_ACCOMMODATIONS   số phòng nghỉ (mặc định 100)
+#   FAKE_TYPES            số loại phòng (mặc định 9)
+#   FAKE_IMAGES           số ảnh mỗi loại phòng, dùng để tăng kích thước payload (mặc định 10)
+#   FAKE_EMBED            "1" để trả về _embedded trong /accommodations (mặc định 1)
+#   FAKE_ETAG             "1" để danh sách có ETag và trả về 304 khi If-None-Match khớp (mặc định 1)
+import asyncio
+import hashlib
+import json
+import os
+import random
+from typing import Optional
+
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse
+
+LATENCY_MS = float(os.getenv("FAKE_LATENCY_MS", "50"))
+JITTER_MS = float(os.getenv("FAKE_JITTER_MS", "0"))
+ACCOMMODATIONS = int(os.getenv("FAKE_ACCOMMODATIONS", "100"))
+TYPES = int(os.getenv("FAKE_TYPES", "9"))
+IMAGES = int(os.getenv("FAKE_IMAGES", "10"))
+EMBED = os.getenv("FAKE_EMBED", "1") == "1"
+ETAG = os.getenv("FAKE_ETAG", "1") == "1"
+
+# Dùng đúng các ID trong ROOM_TYPES_MAP để endpoint availability hoạt động
+TYPE_IDS = [1943, 1189, 1190, 1191, 1192, 1015, 1006, 986, 3632][:TYPES] or [986]
+
+
+async def _delay() -> None:
+    await asyncio.sleep((LATENCY_MS + random.uniform(0, JITTER_MS)) / 1000)
+
+
+def _room_type(type_id: int) -> dict:
+    return {
+        "id": type_id,
+        "title": f"Loại phòng {type_id}",
+        "adults": 2,
+        "children": 1,
+        "size": 32,
+        "price": {"regular_price_label": "1.200.000₫"},
+        "amenities": [{"id": i, "title": f"Tiện nghi {i}"} for i in range(8)],
+        "services": [{"id": i, "title": f"Dịch vụ {i}"} for i in range(4)],
+        "images": [{"id": i, "src": f"https://example.com/rooms/{type_id}/{i}.jpg"} for i in range(IMAGES)],
+    }
+
+
+ROOM_TYPES = {type_id: _room_type(type_id) for type_id in TYPE_IDS}
+
+
+def _accommodation(i: int) -> dict:
+    type_id = TYPE_IDS[i % len(TYPE_IDS)]
+    item = {
+        "id": 10000 + i,
+        "title": f"Phòng {i}",
+        "status": "publish",
+        "excerpt": "Phòng hướng biển, ban công riêng.",
+        "accommodation_type_id": type_id,
+        "date_modified_gmt": "2025-01-01T00:00:00",
+    }
+    if EMBED:
+        item["_embedded"] = {"accommodation_type_id": [ROOM_TYPES[type_id]]}
+    return item
+
+
+ALL_ACCOMMODATIONS = [_accommodation(i) for i in range(ACCOMMODATIONS)]
+
+
+def _paginate(items: list, request: Request) -> Response:
+    per_page = int(request.query_params.get("per_page", 10))
+    page = int(request.query_params.get("page", 1))
+    total_pages = max(1, (len(items) + per_page - 1) // per_page)
+    page_items = items[(page - 1) * per_page:page * per_page]
+    # _fields của WordPress REST: chỉ trả về các trường được yêu cầu
+    wp_fields = request.query_params.get("_fields")
+    if wp_fields:
+        keep = wp_fields.split(",")
+        page_items = [{k: v for k, v in item.items() if k in keep} for item in page_items]
+    headers = {"X-WP-Total": str(len(items)), "X-WP-TotalPages": str(total_pages)}
+    if ETAG:
+        body = json.dumps(page_items, ensure_ascii=False).encode("utf-8")
+        headers["ETag"] = '"' + hashlib.md5(body).hexdigest() + '"'
+        if request.headers.get("if-none-match") == headers["ETag"]:
+            return Response(status_code=304, headers=headers)
+        return Response(body, media_type="application/json", headers=headers)
+    return JSONResponse(page_items, headers=headers)
+
+
+wp_app = FastAPI()
+
+
+@wp_app.get("/accommodations")
+async def accommodations(request: Request):
+    await _delay()
+    return _paginate(ALL_ACCOMMODATIONS, request)
+
+
+@wp_app.get("/accommodation_types")
+async def accommodation_types(request: Request, include: Optional[str] = None):
+    await _delay()
+    items = list(ROOM_TYPES.values())
+    if include:
+        wanted = {int(x) for x in include.split(",") if x.strip().isdigit()}
+        items = [item for item in items if item["id"] in wanted]
+    return _paginate(items, request)
+
+
+@wp_app.get("/accommodation_types/{type_id}")
+async def accommodation_type(type_id: int):
+    await _delay()
+    if type_id not in ROOM_TYPES:
+        return JSONResponse({"code": "not_found"}, status_code=404)
+    return ROOM_TYPES[type_id]
+
+
+@wp_app.get("/bookings/availability/")
+async def availability(request: Request):
+    await _delay()
+    params = dict(request.query_params)
+    return {**params, "available": True, "available_count": 3}
+
+
+@wp_app.get("/bookings")
+async def bookings(request: Request):
+    await _delay()
+    items = [
+        {
+            "id": i,
+            "status": "confirmed",
+            "date_modified_gmt": "2025-01-01T00:00:00",
+            "check_in_date": "2025-06-01",
+            "check_out_date": "2025-06-03",
+            "reserved_accommodations": [{"accommodation": 10000 + i, "accommodation_type": TYPE_IDS[i % len(TYPE_IDS)]}],
+        }
+        for i in range(50)
+    ]
+    return _paginate(items, request)
+
+
+@wp_app.post("/bookings")
+async def create_booking(request: Request):
+    await _delay()
+    body = await request.json()
+    return JSONResponse({"id": random.randint(1, 10 ** 6), **body}, status_code=201)
+
+
+zalo_app = FastAPI()
+
+
+@zalo_app.get("/v2.0/me/info")
+async def me_info(request: Request):
+    await _delay()
+    if not request.headers.get("access_token") or not request.headers.get("code"):
+        return JSONResponse({"error": -201, "message": "invalid token"}, status_code=400)
+    return {"data": {"number": "84900000000"}, "error": 0, "message": "Success"}
+
+
+@zalo_app.get("/health")
+async def health():
+    return Response(status_code=204)
@@ -0,0 +1,308 @@
+# bench/run.py
+# Benchmark chạy hoàn toàn offline: dựng server giả lập WordPress/Zalo (bench/fakes.py),
+# database SQLite có dữ liệu mẫu (bench/seed.py), chạy ứng dụng bằng uvicorn rồi bắn tải
+# lên từng route và in throughput + p50/p95/p99.
+#
+# Ví dụ:
+#   python -m bench.run --duration 10 --concurrency 20
+#   python -m bench.run --routes services,accommodations --latency-ms 200 --json before.json
+#   python -m bench.run --env CATALOG_CACHE_TTL=0 --env AVAILABILITY_CACHE_TTL=0
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Mỗi route: (phương thức, đường dẫn, hàm tạo tham số theo số thứ tự request)
+RequestFactory = Callable[[int], Dict[str, Any]]
+
+
+def _availability(i: int) -> Dict[str, Any]:
+    day = 1 + i % 20
+    return {"params": {
+        "check_in_date": f"2025-07-{day:02d}",
+        "check_out_date": f"2025-07-{day + 2:02d}",
+        "accommodation_title": "Standard Room",
+        "adults": 2,
+    }}
+
+
+def _availability_batch(i: int) -> Dict[str, Any]:
+    return {"json": {
+        "rooms": ["Standard Room", "Double Room", 1015],
+        "date_ranges": [
+            {"check_in_date": f"2025-08-{d:02d}", "check_out_date": f"2025-08-{d + 2:02d}"}
+            for d in (1 + i % 5, 10 + i % 5)
+        ],
+        "adults": 2,
+    }}
+
+
+def _create_booking(i: int) -> Dict[str, Any]:
+    return {"json": {
+        "check_in_date": "2025-09-01",
+        "check_out_date": "2025-09-03",
+        "reserved_accommodations": [{"accommodation": 10000 + i % 100, "accommodation_type": 986, "adults": 2}],
+        "customer": {"first_name": "An", "last_name": "Nguyen", "email": f"bench{i}@example.com"},
+    }}
+
+
+def _phone_number(i: int) -> Dict[str, Any]:
+    # Token khác nhau cho mỗi request, giống nhiều người dùng thật (không trúng cache)
+    return {"json": {"token": f"code-{i}", "access_token": "bench-access-token"}}
+
+
+# Từ khóa có dấu / không dấu / tiền tố, khớp dữ liệu của bench.seed và bench.fakes
+SEARCH_QUERIES = ["dich vu", "Tiện ích 1", "spa", "uu dai", "room", "trans"]
+
+
+ROUTES: Dict[str, Tuple[str, str, RequestFactory]] = {
+    "home": ("GET", "/", lambda i: {}),
+    "home_screen": ("GET", "/home/", lambda i: {}),
+    "utilities": ("GET", "/utilities/", lambda i: {}),
+    "utilities_page": ("GET", "/utilities/", lambda i: {"params": {"limit": 20, "after_id": i % 400}}),
+    "services": ("GET", "/services/", lambda i: {}),
+    "service_by_id": ("GET", "/services/{id}", lambda i: {"id": 1 + i % 400}),
+    "accommodations": ("GET", "/api/accommodations/", lambda i: {}),
+    "accommodations_summary": ("GET", "/api/accommodations/", lambda i: {"params": {"view": "summary"}}),
+    "accommodations_all": ("GET", "/api/accommodations/", lambda i: {"params": {"all_pages": "true", "per_page": 20}}),
+    "accommodation_types": ("GET", "/api/bookings/accommodation_types/", lambda i: {}),
+    "availability": ("GET", "/api/bookings/availability/", _availability),
+    "availability_batch": ("POST", "/api/bookings/availability/batch", _availability_batch),
+    "bookings": ("GET", "/api/bookings/", lambda i: {}),
+    "create_booking": ("POST", "/api/bookings/", _create_booking),
+    "phone_number": ("POST", "/api/get-phone-number", _phone_number),
+    "search": ("GET", "/api/search", lambda i: {"params": {"q": SEARCH_QUERIES[i % len(SEARCH_QUERIES)]}}),
+}
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * pct / 100
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+class Stack:
+    """
+    Các tiến trình uvicorn (WordPress giả, Zalo giả, ứng dụng) cho một lần benchmark.
+    """
+
+    def __init__(self, args: argparse.Namespace, workdir: str):
+        self.args = args
+        self.workdir = workdir
+        self.procs: List[subprocess.Popen] = []
+        self.wp_port = _free_port()
+        self.zalo_port = _free_port()
+        self.app_port = _free_port()
+        self.base_url = f"http://127.0.0.1:{self.app_port}"
+        self.env = self._build_env()
+
+    def _build_env(self) -> Dict[str, str]:
+        env = dict(os.environ)
+        env.update({
+            "PYTHONPATH": ROOT + os.pathsep + env.get("PYTHONPATH", ""),
+            "DATABASE_URL": f"sqlite:///{os.path.join(self.workdir, 'bench.db')}",
+            "WP_API_URL": f"http://127.0.0.1:{self.wp_port}",
+            "WP_CONSUMER_KEY": "ck_bench",
+            "WP_CONSUMER_SECRET": "cs_bench",
+            "ZALO_GRAPH_URL": f"http://127.0.0.1:{self.zalo_port}/v2.0/me/info",
+            "ZALO_APP_ID": "bench",
+            "ZALO_APP_SECRET": "bench",
+            "LOG_LEVEL": "WARNING",
+            # Mọi request đến từ cùng một IP: tắt giới hạn theo client (bật lại bằng --env)
+            "ADMISSION_CLIENT_RATE": "0",
+            "FAKE_LATENCY_MS": str(self.args.latency_ms),
+            "FAKE_JITTER_MS": str(self.args.jitter_ms),
+            "FAKE_ACCOMMODATIONS": str(self.args.accommodations),
+            "FAKE_IMAGES": str(self.args.images),
+        })
+        for item in self.args.env:
+            key, _, value = item.partition("=")
+            env[key] = value
+        return env
+
+    def _spawn(self, name: str, app: str, port: int, workers: int = 1) -> None:
+        log_file = open(os.path.join(self.workdir, f"{name}.log"), "wb")
+        cmd = [
+            sys.executable, "-m", "uvicorn", app,
+            "--host", "127.0.0.1", "--port", str(port),
+            "--workers", str(workers), "--log-level", "warning", "--no-access-log",
+        ]
+        self.procs.append(subprocess.Popen(cmd, cwd=ROOT, env=self.env, stdout=log_file, stderr=subprocess.STDOUT))
+
+    def start(self) -> None:
+        subprocess.run(
+            [sys.executable, "-m", "bench.seed",
+             "--services", str(self.args.services), "--utilities", str(self.args.utilities)],
+            cwd=ROOT, env=self.env, check=True, stdout=subprocess.DEVNULL,
+        )
+        self._spawn("wordpress", "bench.fakes:wp_app", self.wp_port)
+        self._spawn("zalo", "bench.fakes:zalo_app", self.zalo_port)
+        self._spawn("app", "main:app", self.app_port, self.args.workers)
+        for url in (
+            f"http://127.0.0.1:{self.zalo_port}/health",
+            f"http://127.0.0.1:{self.wp_port}/openapi.json",
+            f"{self.base_url}/",
+        ):
+            self._wait_ready(url)
+
+    def _wait_ready(self, url: str, timeout: float = 30) -> None:
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            try:
+                httpx.get(url, timeout=1)
+                return
+            except httpx.TransportError:
+                time.sleep(0.1)
+        raise RuntimeError(f"Server không khởi động được: {url} (xem log trong {self.workdir})")
+
+    def stop(self) -> None:
+        for proc in self.procs:
+            proc.terminate()
+        for proc in self.procs:
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+
+
+async def _run_route(
+    client: httpx.AsyncClient, name: str, duration: float, concurrency: int, warmup: int
+) -> Dict[str, Any]:
+    method, path, factory = ROUTES[name]
+    counter = {"n": 0}
+
+    def next_request() -> Tuple[str, Dict[str, Any]]:
+        counter["n"] += 1
+        kwargs = factory(counter["n"])
+        url = path.format(id=kwargs.pop("id", ""))
+        return url, kwargs
+
+    for _ in range(warmup):
+        url, kwargs = next_request()
+        await client.request(method, url, **kwargs)
+
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    wire_bytes = {"total": 0}
+    deadline = time.perf_counter() + duration
+
+    async def worker() -> None:
+        while time.perf_counter() < deadline:
+            url, kwargs = next_request()
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, url, **kwargs)
+                key = str(response.status_code)
+                # Số byte thực sự nhận qua mạng (sau nén, nếu có)
+                wire_bytes["total"] += response.num_bytes_downloaded
+            except httpx.HTTPError as e:
+                key = type(e).__name__
+            latencies.append(time.perf_counter() - started)
+            statuses[key] = statuses.get(key, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "route": name,
+        "method": method,
+        "path": path,
+        "requests": len(latencies),
+        "errors": sum(count for key, count in statuses.items() if not key.startswith(("2", "3"))),
+        "statuses": statuses,
+        "rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(_percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(_percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(_percentile(latencies, 99) * 1000, 2),
+        "wire_kb": round(wire_bytes["total"] / len(latencies) / 1024, 2) if latencies else 0.0,
+    }
+
+
+async def _run_all(base_url: str, routes: List[str], args: argparse.Namespace) -> List[Dict[str, Any]]:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=args.timeout) as client:
+        results = []
+        for name in routes:
+            result = await _run_route(client, name, args.duration, args.concurrency, args.warmup)
+            _print_row(result)
+            results.append(result)
+        return results
+
+
+def _print_header() -> None:
+    print(f"{'route':<22}{'req':>8}{'err':>6}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'KB/req':>10}")
+
+
+def _print_row(r: Dict[str, Any]) -> None:
+    print(
+        f"{r['route']:<22}{r['requests']:>8}{r['errors']:>6}{r['rps']:>10}"
+        f"{r['p50_ms']:>10}{r['p95_ms']:>10}{r['p99_ms']:>10}{r['wire_kb']:>10}",
+        flush=True,
+    )
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark offline cho các route của ứng dụng")
+    parser.add_argument("--routes", default=",".join(ROUTES), help="danh sách route, cách nhau bởi dấu phẩy")
+    parser.add_argument("--duration", type=float, default=5.0, help="số giây bắn tải cho mỗi route")
+    parser.add_argument("--concurrency", type=int, default=10, help="số kết nối đồng thời")
+    parser.add_argument("--warmup", type=int, default=5, help="số request khởi động (không tính) mỗi route")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--workers", type=int, default=1, help="số worker uvicorn của ứng dụng")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="độ trễ của WordPress/Zalo giả")
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--accommodations", type=int, default=100, help="số phòng trên WordPress giả")
+    parser.add_argument("--images", type=int, default=10, help="số ảnh mỗi loại phòng (kích thước payload)")
+    parser.add_argument("--services", type=int, default=500)
+    parser.add_argument("--utilities", type=int, default=500)
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE",
+                        help="biến môi trường thêm cho ứng dụng, ví dụ --env CATALOG_CACHE_TTL=0")
+    parser.add_argument("--json", dest="json_path", help="ghi kết quả ra file JSON để so sánh trước/sau")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    routes = [name.strip() for name in args.routes.split(",") if name.strip()]
+    unknown = [name for name in routes if name not in ROUTES]
+    if unknown:
+        sys.exit(f"Route không tồn tại: {', '.join(unknown)}. Có: {', '.join(ROUTES)}")
+
+    with tempfile.TemporaryDirectory(prefix="bench-") as workdir:
+        stack = Stack(args, workdir)
+        try:
+            stack.start()
+            _print_header()
+            results = asyncio.run(_run_all(stack.base_url, routes, args))
+        finally:
+            stack.stop()
+
+    if args.json_path:
+        config = {k: v for k, v in vars(args).items() if k != "json_path"}
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump({"config": config, "results": results}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
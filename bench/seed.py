@@ -0,0 +1,65 @@
+# bench/seed.py
+# Tạo database SQLite với N dịch vụ và N tiện ích để benchmark các route đọc từ DB.
+# Chạy: DATABASE_URL=sqlite:////tmp/bench.db python -m bench.seed --services 500 --utilities 500
+import argparse
+import os
+import sys
+
+UTILITY_TYPES = ["spa", "restaurant", "pool", "gym", "kids"]
+SERVICE_CATEGORIES = ["food", "tour", "transport", "wellness"]
+
+
+def seed(services: int, utilities: int, images: int = 5) -> None:
+    # Import trong hàm để DATABASE_URL đã được đặt trước khi database.py đọc cấu hình
+    import main
+    from database import SessionLocal, migrate
+
+    migrate()
+    db = SessionLocal()
+    try:
+        db.query(main.UtilityImage).delete()
+        db.query(main.Utility).delete()
+        db.query(main.Service).delete()
+        db.add_all(
+            main.Utility(
+                id=i,
+                type=UTILITY_TYPES[i % len(UTILITY_TYPES)],
+                images=[f"https://example.com/utilities/{i}/{j}.jpg" for j in range(images)],
+                title=f"Tiện ích {i}",
+                description="Mô tả tiện ích " * 10,
+                vr360_url=f"https://example.com/vr/{i}",
+                video_url=f"https://example.com/video/{i}.mp4",
+            )
+            for i in range(1, utilities + 1)
+        )
+        db.add_all(
+            main.Service(
+                id=i,
+                title=f"Dịch vụ {i}",
+                subtitle="Ưu đãi trong tuần",
+                discount="10%",
+                rating="4.5",
+                image=f"https://example.com/services/{i}.jpg",
+                category=SERVICE_CATEGORIES[i % len(SERVICE_CATEGORIES)],
+                description="Mô tả dịch vụ " * 10,
+            )
+            for i in range(1, services + 1)
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+def main_cli(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Tạo dữ liệu mẫu cho benchmark")
+    parser.add_argument("--services", type=int, default=500)
+    parser.add_argument("--utilities", type=int, default=500)
+    parser.add_argument("--images", type=int, default=5, help="số ảnh mỗi tiện ích")
+    args = parser.parse_args(argv)
+    if not os.getenv("DATABASE_URL", "").startswith("sqlite"):
+        sys.exit("DATABASE_URL phải trỏ tới một file SQLite (benchmark không ghi vào database thật)")
+    seed(args.services, args.utilities, args.images)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,183 @@
+# database.py
+import os
+import threading
+from contextlib import asynccontextmanager
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.declarative import declarative_base
+
+from routers.logger import get_logger
+
+log = get_logger("database")
+
+# 1. Khai báo thông tin kết nối từ database của bạn
+DB_HOST = os.getenv("DB_HOST", "sql12.freesqldatabase.com")
+DB_NAME = os.getenv("DB_NAME", "sql12795417")
+DB_USER = os.getenv("DB_USER", "sql12795417")
+DB_PASS = os.getenv("DB_PASS", "iw8ykWbXXe")
+
+# 2. Tạo chuỗi kết nối (connection string)
+DATABASE_URL = os.getenv("DATABASE_URL", f"mysql+mysqlconnector://{DB_USER}:{DB_PASS}@{DB_HOST}/{DB_NAME}")
+
+# Cấu hình connection pool (pre-ping loại bỏ kết nối chết, recycle trước wait_timeout của MySQL)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "280"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "1") == "1"
+
+# Chế độ async: dùng driver bất đồng bộ (aiomysql cho MySQL, aiosqlite khi test với SQLite)
+DB_ASYNC = os.getenv("DB_ASYNC", "0") == "1"
+ASYNC_DATABASE_URL = os.getenv(
+    "ASYNC_DATABASE_URL",
+    DATABASE_URL.replace("mysql+mysqlconnector://", "mysql+aiomysql://").replace("sqlite://", "sqlite+aiosqlite://", 1),
+)
+
+
+def _engine_options(url: str) -> dict:
+    options = {"pool_pre_ping": DB_POOL_PRE_PING, "pool_recycle": DB_POOL_RECYCLE}
+    # SQLite không dùng pool kết nối theo kích thước như MySQL
+    if not url.startswith("sqlite"):
+        options.update(pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW, pool_timeout=DB_POOL_TIMEOUT)
+    return options
+
+
+# Chế độ tạo bảng (giảm thời gian cold start trên serverless):
+# - "startup": tạo bảng khi ứng dụng khởi động (lifespan)
+# - "lazy": kiểm tra/tạo bảng một lần ở lần đầu tiên mở session (mặc định)
+# - "skip": không bao giờ tự tạo
+# Ở mọi chế độ, index mới trên bảng đã có và các bước chuyển dữ liệu chỉ chạy bằng
+# `python migrate.py` khi deploy, không chạy trong request.
+DB_SCHEMA_MODE = os.getenv("DB_SCHEMA_MODE", "lazy")
+
+
+# 3. Engine SQLAlchemy được tạo ở lần dùng đầu tiên (không import driver MySQL lúc import module)
+_engine = None
+_session_factory = None
+_schema_ready = False
+_schema_lock = threading.Lock()
+
+def get_engine():
+    global _engine
+    if _engine is None:
+        _engine = create_engine(DATABASE_URL, **_engine_options(DATABASE_URL))
+    return _engine
+
+# 4. SessionLocal: dùng như trước (db = SessionLocal()), nhưng engine chỉ được tạo khi cần
+def SessionLocal():
+    global _session_factory
+    if _session_factory is None:
+        _session_factory = sessionmaker(autocommit=False, autoflush=False, bind=get_engine())
+    if DB_SCHEMA_MODE == "lazy" and not _schema_ready:
+        ensure_schema()
+    return _session_factory()
+
+# 5. Tạo một Base class để định nghĩa các model (bảng)
+Base = declarative_base()
+
+# Các bước chuyển dữ liệu chạy khi migrate (đăng ký bằng on_schema_created)
+_schema_hooks = []
+
+def on_schema_created(hook):
+    """
+    Đăng ký một hàm hook(connection) chạy bởi migrate() sau khi các bảng và index được tạo,
+    trong cùng transaction. Hook phải idempotent vì migrate.py có thể chạy nhiều lần.
+    """
+    _schema_hooks.append(hook)
+    return hook
+
+def _create_tables(connection) -> None:
+    Base.metadata.create_all(bind=connection)
+
+def _migrate(connection) -> None:
+    Base.metadata.create_all(bind=connection)
+    # create_all không thêm index mới vào bảng đã tồn tại (ví dụ service.category)
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=connection, checkfirst=True)
+    for hook in _schema_hooks:
+        hook(connection)
+
+def migrate() -> None:
+    """
+    Tạo bảng và index còn thiếu rồi chạy các bước chuyển dữ liệu (dùng bởi migrate.py).
+    Lỗi được ném ra thay vì chỉ ghi log.
+    """
+    global _schema_ready
+    with get_engine().begin() as connection:
+        _migrate(connection)
+    log.info("schema_migrated")
+    _schema_ready = True
+
+def ensure_schema() -> None:
+    """
+    Tạo các bảng còn thiếu (chỉ chạy một lần cho mỗi tiến trình).
+    """
+    global _schema_ready
+    if _schema_ready:
+        return
+    with _schema_lock:
+        if _schema_ready:
+            return
+        try:
+            with get_engine().begin() as connection:
+                _create_tables(connection)
+            log.info("schema_ready")
+        except Exception as e:
+            log.error("schema_create_error", error=str(e))
+        # Không thử lại ở mỗi request nếu lỗi; dùng migrate.py để tạo bảng thủ công
+        _schema_ready = True
+
+# 6. Hàm dependency để tạo và đóng session
+def get_db():
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+# 7. Engine và session bất đồng bộ (chỉ dùng khi DB_ASYNC=1, tạo ở lần dùng đầu tiên)
+_async_engine = None
+_async_session_factory = None
+
+def get_async_engine():
+    global _async_engine
+    if _async_engine is None:
+        from sqlalchemy.ext.asyncio import create_async_engine
+
+        _async_engine = create_async_engine(ASYNC_DATABASE_URL, **_engine_options(ASYNC_DATABASE_URL))
+    return _async_engine
+
+async def ensure_schema_async() -> None:
+    global _schema_ready
+    if _schema_ready:
+        return
+    try:
+        async with get_async_engine().begin() as connection:
+            await connection.run_sync(_create_tables)
+        log.info("schema_ready")
+    except Exception as e:
+        log.error("schema_create_error", error=str(e))
+    _schema_ready = True
+
+@asynccontextmanager
+async def AsyncSessionLocal():
+    global _async_session_factory
+    if _async_session_factory is None:
+        from sqlalchemy.ext.asyncio import async_sessionmaker
+
+        _async_session_factory = async_sessionmaker(get_async_engine(), autoflush=False, expire_on_commit=False)
+    if DB_SCHEMA_MODE == "lazy" and not _schema_ready:
+        await ensure_schema_async()
+    async with _async_session_factory() as db:
+        yield db
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def dispose_engines() -> None:
+    if _async_engine is not None:
+        await _async_engine.dispose()
+    if _engine is not None:
+        _engine.dispose()
@@ -1,42 +1,100 @@
 # main.py
+import asyncio
+import time
+
+# Mốc thời gian bắt đầu import, dùng để báo cáo thời gian cold start
+_BOOT_STARTED = time.perf_counter()
 
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi import FastAPI, Depends, HTTPException
-from sqlalchemy import create_engine, Column, Integer, String, Text
-from sqlalchemy.orm import sessionmaker, Session
-from sqlalchemy.ext.declarative import declarative_base
-from typing import List, Dict
+from fastapi import FastAPI, HTTPException, Request, Query, Response
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import Column, ForeignKey, Integer, String, Text, select
+from sqlalchemy.orm import load_only, noload, relationship, selectinload
+from typing import List, Dict, Optional
+import os
+from contextlib import asynccontextmanager
  
-from routers import zalo, booking, accommodation
-
-# 1. Khai báo thông tin kết nối từ database của bạn
-DB_HOST = "sql12.freesqldatabase.com"
-DB_NAME = "sql12795417"
-DB_USER = "sql12795417"
-DB_PASS = "iw8ykWbXXe"
+from routers import zalo, booking, accommodation, upstream, admin, inventory, metrics, outbox, search
+from routers.snapshot import ResponseSnapshot, invalidate_on_change
+from routers.responses import FastJSONResponse, dumps
+from routers.compression import CompressionMiddleware
+from routers.config import ADMISSION, COMPRESSION, SNAPSHOT_MAX_AGE
+from routers.admission import AdmissionMiddleware
+from routers.logger import setup_logging, shutdown_logging, get_logger
 
-# 2. Tạo chuỗi kết nối (connection string)
-DATABASE_URL = f"mysql+mysqlconnector://{DB_USER}:{DB_PASS}@{DB_HOST}/{DB_NAME}"
+# Logging có cấu trúc, ghi qua hàng đợi (không chặn request khi stdout chậm)
+setup_logging()
+log = get_logger("main")
 
-# 3. Tạo một engine SQLAlchemy
-engine = create_engine(DATABASE_URL)
+# 1-5. Kết nối database (engine, SessionLocal, Base, async engine) được khai báo trong database.py
+from database import (
+    SessionLocal, Base, DB_ASYNC, DB_SCHEMA_MODE, AsyncSessionLocal,
+    ensure_schema, ensure_schema_async, dispose_engines, on_schema_created,
+)
 
-# 4. Tạo một SessionLocal class
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Kích thước trang mặc định/tối đa cho các danh sách có phân trang
+PAGE_SIZE_DEFAULT = int(os.getenv("PAGE_SIZE_DEFAULT", "50"))
+PAGE_SIZE_MAX = int(os.getenv("PAGE_SIZE_MAX", "200"))
 
-# 5. Tạo một Base class để định nghĩa các model (bảng)
-Base = declarative_base()
+# Ngân sách thời gian (ms) cho import + khởi động; vượt quá sẽ in cảnh báo lúc boot
+STARTUP_BUDGET_MS = float(os.getenv("STARTUP_BUDGET_MS", "1000"))
 
 # 6. Định nghĩa model cho bảng 'utility' (giữ lại từ trước)
+def _normalize_image_urls(value) -> List[str]:
+    """
+    Nhận danh sách URL hoặc chuỗi nhiều dòng (định dạng cũ), bỏ khoảng trắng và dòng trống.
+    """
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = value.splitlines()
+    return [url.strip() for url in value if url and url.strip()]
+
+class UtilityImage(Base):
+    __tablename__ = "utility_image"
+    id = Column(Integer, primary_key=True)
+    utility_id = Column(Integer, ForeignKey("utility.id", ondelete="CASCADE"), nullable=False, index=True)
+    position = Column(Integer, nullable=False, default=0)
+    url = Column(String(1024), nullable=False)
+
 class Utility(Base):
     __tablename__ = "utility"
     id = Column(Integer, primary_key=True, index=True)
     type = Column(String(255), index=True)
-    images = Column(Text)
+    # Cột cũ: các URL cách nhau bởi xuống dòng. Dữ liệu được chép sang bảng utility_image
+    # (xem _migrate_utility_images) nhưng cột vẫn được giữ và ghi song song, để phiên bản cũ
+    # vẫn đọc được; khi utility chưa có dòng nào trong utility_image thì đọc ảnh từ cột này.
+    legacy_images = Column("images", Text)
     title = Column(String(255))
     description = Column(Text)
     vr360_url = Column(String(255))
     video_url = Column(String(255))
+    # Ảnh theo thứ tự, được nạp bằng một truy vấn selectin cho cả danh sách tiện ích
+    image_items = relationship(
+        UtilityImage,
+        order_by=UtilityImage.position,
+        lazy="selectin",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+    )
+
+    # Trường trả về dạng danh sách -> relationship tương ứng (dùng khi chọn fields=)
+    RELATIONSHIP_FIELDS = {"images": "image_items"}
+    # Cột cần đọc kèm khi trường được chọn (ảnh của dòng chưa được chuyển sang utility_image)
+    FALLBACK_COLUMNS = {"images": "legacy_images"}
+
+    @property
+    def images(self) -> List[str]:
+        if self.image_items:
+            return [image.url for image in self.image_items]
+        return _normalize_image_urls(self.legacy_images)
+
+    @images.setter
+    def images(self, value) -> None:
+        # Chuẩn hóa ngay khi ghi để việc đọc không phải xử lý chuỗi nữa
+        urls = _normalize_image_urls(value)
+        self.image_items = [UtilityImage(position=position, url=url) for position, url in enumerate(urls)]
+        self.legacy_images = "\n".join(urls) or None
 
 # 7. Định nghĩa model mới cho bảng 'service'
 class Service(Base):
@@ -47,93 +105,348 @@ class Service(Base):
     discount = Column(String(255))
     rating = Column(String(255))
     image = Column(Text)
-    category = Column(String(255))
+    category = Column(String(255), index=True)
     description = Column(Text)
 
-# 8. Hàm dependency để tạo và đóng session
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+@on_schema_created
+def _migrate_utility_images(connection) -> None:
+    """
+    Chép các URL trong cột utility.images (định dạng cũ) sang bảng utility_image cho các utility
+    chưa có ảnh trong bảng mới; cột cũ được giữ nguyên. Dòng utility được khóa (FOR UPDATE) và
+    kiểm tra lại trước khi chèn, nên khi nhiều tiến trình chạy cùng lúc ảnh không bị chèn trùng.
+    """
+    utility, image = Utility.__table__, UtilityImage.__table__
+    has_images = select(image.c.id).where(image.c.utility_id == utility.c.id).exists()
+    rows = connection.execute(
+        select(utility.c.id, utility.c.images).where(utility.c.images.isnot(None), ~has_images)
+    ).all()
+    migrated = 0
+    for utility_id, text in rows:
+        urls = _normalize_image_urls(text)
+        if not urls:
+            continue
+        connection.execute(select(utility.c.id).where(utility.c.id == utility_id).with_for_update())
+        # Đọc có khóa để thấy dữ liệu mới nhất (không phải snapshot đầu transaction)
+        exists = connection.execute(
+            select(image.c.id).where(image.c.utility_id == utility_id).limit(1).with_for_update()
+        ).first()
+        if exists is not None:
+            continue
+        connection.execute(image.insert(), [
+            {"utility_id": utility_id, "position": position, "url": url}
+            for position, url in enumerate(urls)
+        ])
+        migrated += 1
+    if migrated:
+        log.info("utility_images_migrated", utilities=migrated)
+
+# 8. Tạo ứng dụng FastAPI
+def _report_boot_timings(app: FastAPI, startup_ms: float) -> None:
+    timings = {
+        "import_ms": round(IMPORT_MS, 1),
+        "startup_ms": round(startup_ms, 1),
+        "total_ms": round(IMPORT_MS + startup_ms, 1),
+        "budget_ms": STARTUP_BUDGET_MS,
+        "schema_mode": DB_SCHEMA_MODE,
+    }
+    app.state.boot_timings = timings
+    log.info("boot_timings", **timings)
+    if timings["total_ms"] > STARTUP_BUDGET_MS:
+        log.warning("boot_over_budget", **timings)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    startup_started = time.perf_counter()
+    # DB_SCHEMA_MODE="startup": tạo bảng ngay khi khởi động thay vì ở lần truy vấn đầu tiên
+    if DB_SCHEMA_MODE == "startup":
+        if DB_ASYNC:
+            await ensure_schema_async()
+        else:
+            await run_in_threadpool(ensure_schema)
+    # Khởi tạo HTTP client dùng chung (keep-alive) cho các router proxy WordPress
+    await upstream.start_client()
+    # Đồng bộ nền bản sao inventory cục bộ (chỉ chạy khi INVENTORY_MODE khác "remote")
+    inventory.start_sync_worker()
+    # Worker gửi các đơn đặt phòng trong outbox (request có Idempotency-Key) tới WordPress
+    outbox.start_worker()
+    _report_boot_timings(app, (time.perf_counter() - startup_started) * 1000)
+    yield
+    await outbox.stop_worker()
+    await inventory.stop_sync_worker()
+    await upstream.close_client()
+    await dispose_engines()
+    shutdown_logging()
 
-# 9. Tạo ứng dụng FastAPI
-app = FastAPI()
+# FastJSONResponse: mã hóa JSON bằng orjson (nếu đã cài) cho mọi endpoint
+app = FastAPI(lifespan=lifespan, default_response_class=FastJSONResponse)
 
 origins = [
     "*"
 ]
 
+# Kiểm soát tải cho các route proxy WordPress/Zalo (429/503 kèm Retry-After). Thêm trước CORS
+# để response từ chối vẫn có header CORS; các route cục bộ không đi qua hàng đợi.
+if ADMISSION:
+    app.add_middleware(AdmissionMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Cho mini-app (khác origin) đọc được các header tự đặt: cursor phân trang, ETag, Retry-After...
+    expose_headers=["X-Next-Cursor", "ETag", "Retry-After", "Location"],
 )
 
-# 10. Tự động tạo cả hai bảng 'utility' và 'service' nếu chưa tồn tại
-try:
-    Base.metadata.create_all(bind=engine)
-    print("Database tables created successfully or already exist.")
-except Exception as e:
-    print(f"Error creating database tables: {e}")
+# Nén gzip/brotli các response lớn (danh sách phòng, tiện ích...) cho client di động
+if COMPRESSION:
+    app.add_middleware(CompressionMiddleware)
 
-# 11. Endpoint cho bảng 'utility' (giữ lại từ trước)
-@app.get("/utilities/")
-def get_all_utilities(db: Session = Depends(get_db)):
-    utilities = db.query(Utility).all()
-    if not utilities:
-        raise HTTPException(status_code=404, detail="Không có tiện ích nào được tìm thấy.")
-    return utilities
+# Đo độ trễ theo route, tách thời gian upstream/DB và thêm header Server-Timing
+app.add_middleware(metrics.MetricsMiddleware)
+
+# 9. Các bảng được tạo theo DB_SCHEMA_MODE (xem database.py), không còn chạy lúc import
+#    để cold start trên Vercel không phải chờ một vòng kết nối tới MySQL.
+
+# 10. Endpoint cho bảng 'utility' (giữ lại từ trước)
+UTILITY_FIELDS = ["id", "type", "images", "title", "description", "vr360_url", "video_url"]
+SERVICE_FIELDS = [column.name for column in Service.__table__.columns]
+
+def _parse_fields(fields: Optional[str], allowed: List[str]) -> List[str]:
+    """
+    Chuyển tham số fields=a,b,c thành danh sách cột (luôn gồm 'id', giữ thứ tự cột của bảng).
+    """
+    if not fields:
+        return allowed
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = sorted(requested - set(allowed))
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Trường không hợp lệ: {', '.join(unknown)}")
+    return [name for name in allowed if name in requested or name == "id"]
+
+def _serialize_utility(utility: Utility, fields: List[str] = UTILITY_FIELDS) -> Dict:
+    # images đã là danh sách URL (bảng utility_image, hoặc cột cũ khi chưa chuyển)
+    return {name: getattr(utility, name) for name in fields}
+
+def _serialize_service(service: Service, fields: List[str] = SERVICE_FIELDS) -> Dict:
+    return {name: getattr(service, name) for name in fields}
+
+def _utilities_query():
+    return select(Utility).order_by(Utility.id)
+
+def _services_query():
+    return select(Service).order_by(Service.id)
+
+def _build_utilities() -> List[Dict]:
+    db = SessionLocal()
+    try:
+        return [_serialize_utility(utility) for utility in db.execute(_utilities_query()).scalars()]
+    finally:
+        db.close()
+
+def _build_services() -> List[Dict]:
+    db = SessionLocal()
+    try:
+        return [_serialize_service(service) for service in db.execute(_services_query()).scalars()]
+    finally:
+        db.close()
+
+async def _abuild_utilities() -> List[Dict]:
+    async with AsyncSessionLocal() as db:
+        return [_serialize_utility(utility) for utility in (await db.execute(_utilities_query())).scalars()]
+
+async def _abuild_services() -> List[Dict]:
+    async with AsyncSessionLocal() as db:
+        return [_serialize_service(service) for service in (await db.execute(_services_query())).scalars()]
+
+def _page_query(model, fields: List[str], filters: Dict, after_id: Optional[int], limit: int):
+    """
+    Phân trang keyset theo id: chỉ đọc các cột được yêu cầu (các cột khác được defer),
+    lọc theo các cột đã đánh index và dừng sau 'limit' dòng. Trường dạng danh sách
+    (RELATIONSHIP_FIELDS) được nạp bằng một truy vấn selectin, hoặc bỏ qua nếu không được chọn.
+    """
+    relationship_fields = getattr(model, "RELATIONSHIP_FIELDS", {})
+    fallback_columns = getattr(model, "FALLBACK_COLUMNS", {})
+    columns = [getattr(model, name) for name in fields if name not in relationship_fields]
+    columns += [getattr(model, fallback_columns[name]) for name in fields if name in fallback_columns]
+    options = [load_only(*columns)]
+    for name, attr in relationship_fields.items():
+        loader = selectinload if name in fields else noload
+        options.append(loader(getattr(model, attr)))
+    query = select(model).options(*options)
+    for column, value in filters.items():
+        if value is not None:
+            query = query.where(column == value)
+    if after_id is not None:
+        query = query.where(model.id > after_id)
+    return query.order_by(model.id).limit(limit)
+
+async def _fetch_page(query, serialize, fields: List[str]) -> List[Dict]:
+    """
+    Chạy truy vấn trên async session (DB_ASYNC=1) hoặc trên session đồng bộ trong threadpool.
+    """
+    if DB_ASYNC:
+        async with AsyncSessionLocal() as db:
+            return [serialize(row, fields) for row in (await db.execute(query)).scalars()]
+
+    def run() -> List[Dict]:
+        db = SessionLocal()
+        try:
+            return [serialize(row, fields) for row in db.execute(query).scalars()]
+        finally:
+            db.close()
+
+    return await run_in_threadpool(run)
+
+async def _get_snapshot(snapshot: ResponseSnapshot):
+    if DB_ASYNC:
+        return await snapshot.aget()
+    return await run_in_threadpool(snapshot.get)
+
+def _page_response(items: List[Dict], limit: int) -> FastJSONResponse:
+    # Header X-Next-Cursor chứa id cuối cùng; client gửi lại qua after_id để lấy trang tiếp theo
+    headers = {"X-Next-Cursor": str(items[-1]["id"])} if len(items) == limit else {}
+    return FastJSONResponse(content=items, headers=headers)
+
+# Response đã mã hóa sẵn (kèm ETag) cho hai danh mục, tự invalidate khi bảng thay đổi
+utilities_snapshot = ResponseSnapshot("utilities", _build_utilities, abuild=_abuild_utilities)
+services_snapshot = ResponseSnapshot("services", _build_services, abuild=_abuild_services)
+invalidate_on_change(utilities_snapshot, Utility, UtilityImage)
+invalidate_on_change(services_snapshot, Service)
+
+# Chỉ mục tìm kiếm (/api/search): tải toàn bộ một lần, sau đó chỉ cập nhật các dòng thay đổi khi commit
+SERVICE_SEARCH_FIELDS = ["id", "title", "subtitle", "category", "image"]
+UTILITY_SEARCH_FIELDS = ["id", "type", "title"]
+
+async def _search_services() -> List[Dict]:
+    query = _page_query(Service, SERVICE_SEARCH_FIELDS, {}, None, None)
+    return await _fetch_page(query, _serialize_service, SERVICE_SEARCH_FIELDS)
+
+async def _search_utilities() -> List[Dict]:
+    query = _page_query(Utility, UTILITY_SEARCH_FIELDS, {}, None, None)
+    return await _fetch_page(query, _serialize_utility, UTILITY_SEARCH_FIELDS)
+
+search.register_source("services", _search_services, ("title", "subtitle", "category"), SNAPSHOT_MAX_AGE)
+search.register_source("utilities", _search_utilities, ("type", "title"), SNAPSHOT_MAX_AGE)
+search.index_on_change("services", Service, SERVICE_SEARCH_FIELDS)
+search.index_on_change("utilities", Utility, UTILITY_SEARCH_FIELDS)
 
 @app.get("/utilities/")
-def get_all_utilities(db: Session = Depends(get_db)):
-    utilities = db.query(Utility).all()
-    if not utilities:
-        raise HTTPException(status_code=404, detail="Không có tiện ích nào được tìm thấy.")
-    
-    processed_utilities = []
-    
-    for utility in utilities:
-        if utility.images:
-            images_list = [url.strip() for url in utility.images.splitlines() if url.strip()]
-        else:
-            images_list = []
-        
-        processed_utilities.append({
-            "id": utility.id,
-            "type": utility.type,
-            "images": images_list,
-            "title": utility.title,
-            "description": utility.description,
-            "vr360_url": utility.vr360_url,
-            "video_url": utility.video_url
-        })
-        
-    return processed_utilities
-
-# 12. Các endpoint MỚI cho bảng 'service'
+async def get_all_utilities(
+    request: Request,
+    after_id: Optional[int] = Query(None, description="Chỉ lấy các tiện ích có id lớn hơn giá trị này"),
+    limit: Optional[int] = Query(None, ge=1, le=PAGE_SIZE_MAX, description="Số tiện ích tối đa"),
+    utility_type: Optional[str] = Query(None, alias="type", description="Lọc theo loại tiện ích"),
+    fields: Optional[str] = Query(None, description="Danh sách trường cần lấy, cách nhau bởi dấu phẩy"),
+):
+    """
+    Lấy danh sách tất cả các tiện ích (images đã được tách thành danh sách URL).
+    Không có tham số: trả về toàn bộ danh mục (hỗ trợ If-None-Match / 304).
+    Có tham số: phân trang keyset theo id, lọc theo type và chỉ lấy các trường trong fields.
+    """
+    if after_id is None and limit is None and utility_type is None and fields is None:
+        built = await _get_snapshot(utilities_snapshot)
+        if built.empty:
+            raise HTTPException(status_code=404, detail="Không có tiện ích nào được tìm thấy.")
+        return utilities_snapshot.respond(request, built)
+
+    selected = _parse_fields(fields, UTILITY_FIELDS)
+    limit = limit or PAGE_SIZE_DEFAULT
+    query = _page_query(Utility, selected, {Utility.type: utility_type}, after_id, limit)
+    return _page_response(await _fetch_page(query, _serialize_utility, selected), limit)
+
+# 11. Các endpoint MỚI cho bảng 'service'
 @app.get("/services/")
-def get_all_services(db: Session = Depends(get_db)):
+async def get_all_services(
+    request: Request,
+    after_id: Optional[int] = Query(None, description="Chỉ lấy các dịch vụ có id lớn hơn giá trị này"),
+    limit: Optional[int] = Query(None, ge=1, le=PAGE_SIZE_MAX, description="Số dịch vụ tối đa"),
+    category: Optional[str] = Query(None, description="Lọc theo danh mục"),
+    fields: Optional[str] = Query(None, description="Danh sách trường cần lấy, cách nhau bởi dấu phẩy"),
+):
     """
     Lấy danh sách tất cả các dịch vụ từ database.
+    Không có tham số: trả về toàn bộ danh mục (hỗ trợ If-None-Match / 304).
+    Có tham số: phân trang keyset theo id, lọc theo category và chỉ lấy các trường trong fields.
     """
-    services = db.query(Service).all()
-    if not services:
-        raise HTTPException(status_code=404, detail="Không có dịch vụ nào được tìm thấy.")
-    return services
+    if after_id is None and limit is None and category is None and fields is None:
+        built = await _get_snapshot(services_snapshot)
+        if built.empty:
+            raise HTTPException(status_code=404, detail="Không có dịch vụ nào được tìm thấy.")
+        return services_snapshot.respond(request, built)
+
+    selected = _parse_fields(fields, SERVICE_FIELDS)
+    limit = limit or PAGE_SIZE_DEFAULT
+    query = _page_query(Service, selected, {Service.category: category}, after_id, limit)
+    return _page_response(await _fetch_page(query, _serialize_service, selected), limit)
 
 @app.get("/services/{service_id}")
-def get_service_by_id(service_id: int, db: Session = Depends(get_db)):
+async def get_service_by_id(service_id: int):
     """
     Lấy thông tin một dịch vụ cụ thể bằng ID.
     """
-    service = db.query(Service).filter(Service.id == service_id).first()
-    if not service:
+    query = select(Service).where(Service.id == service_id)
+    services = await _fetch_page(query, _serialize_service, SERVICE_FIELDS)
+    if not services:
         raise HTTPException(status_code=404, detail="Không tìm thấy dịch vụ.")
-    return service
+    return services[0]
+
+# 12. Endpoint gộp cho màn hình chính của mini-app: một round trip thay cho bốn
+async def _snapshot_section(snapshot: ResponseSnapshot) -> bytes:
+    # Snapshot đã là JSON đã mã hóa, ghép thẳng vào response
+    return (await _get_snapshot(snapshot)).body
+
+HOME_SECTIONS = {
+    "utilities": lambda view: _snapshot_section(utilities_snapshot),
+    "services": lambda view: _snapshot_section(services_snapshot),
+    "accommodations": lambda view: accommodation.cached_accommodations(
+        accommodation.SUMMARY_PARTS if view == "summary" else accommodation.ALL_PARTS
+    ),
+    "accommodation_types": lambda view: booking.cached_accommodation_types(),
+}
+
+def _section_error(e: Exception) -> Dict:
+    if isinstance(e, HTTPException):
+        return {"status_code": e.status_code, "detail": e.detail}
+    return {"status_code": 500, "detail": str(e) or type(e).__name__}
+
+@app.get("/home/")
+async def get_home(
+    sections: Optional[str] = Query(
+        None, description="Các phần cần lấy, cách nhau bởi dấu phẩy: utilities,services,accommodations,accommodation_types"
+    ),
+    view: str = Query("full", pattern="^(full|summary)$", description="Dạng danh sách phòng (như /api/accommodations/)"),
+):
+    """
+    Lấy dữ liệu màn hình chính trong một request: các phần được lấy song song (database và WordPress).
+    Phần bị lỗi có giá trị null và lỗi của nó nằm trong "errors", các phần khác vẫn được trả về.
+    """
+    if sections:
+        selected = [name.strip() for name in sections.split(",") if name.strip()]
+        unknown = sorted(set(selected) - set(HOME_SECTIONS))
+        if unknown:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Phần không hợp lệ: {', '.join(unknown)}. Có thể chọn: {', '.join(HOME_SECTIONS)}",
+            )
+        selected = list(dict.fromkeys(selected))
+    else:
+        selected = list(HOME_SECTIONS)
+
+    results = await asyncio.gather(*(HOME_SECTIONS[name](view) for name in selected), return_exceptions=True)
+
+    parts, errors = [], {}
+    for name, result in zip(selected, results):
+        if isinstance(result, Exception):
+            log.warning("home_section_failed", section=name, error=str(result) or type(result).__name__)
+            errors[name] = _section_error(result)
+            body = b"null"
+        else:
+            body = result if isinstance(result, bytes) else dumps(result)
+        parts.append(dumps(name) + b":" + body)
+    parts.append(b'"errors":' + dumps(errors))
+    return Response(content=b"{" + b",".join(parts) + b"}", media_type="application/json")
 
 @app.get("/")
 def home():
@@ -142,4 +455,10 @@ def home():
 
 app.include_router(zalo.router, prefix="/api", tags=["Zalo"])
 app.include_router(booking.router, prefix="/api")
-app.include_router(accommodation.router, prefix="/api")
\ No newline at end of file
+app.include_router(accommodation.router, prefix="/api")
+app.include_router(admin.router, prefix="/api")
+app.include_router(search.router, prefix="/api")
+app.include_router(metrics.router)
+
+# Thời gian import toàn bộ module (tính đến khi app và các router đã sẵn sàng)
+IMPORT_MS = (time.perf_counter() - _BOOT_STARTED) * 1000
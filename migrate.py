@@ -0,0 +1,10 @@
+# migrate.py
+# Tạo các bảng và index còn thiếu, rồi chạy các bước chuyển dữ liệu (ví dụ utility.images
+# -> bảng utility_image). Chạy mỗi lần deploy (ứng dụng chỉ tự tạo bảng, không tạo index mới
+# hay chuyển dữ liệu):
+#     python migrate.py
+import main  # noqa: F401  (import để đăng ký tất cả các model với Base)
+from database import migrate
+
+if __name__ == "__main__":
+    migrate()
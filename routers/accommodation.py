@@ -1,21 +1,167 @@
-from fastapi import APIRouter, HTTPException
-import requests
-from typing import List, Dict, Any
+import asyncio
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from typing import List, Dict, Any, Optional, Tuple, AsyncIterator, FrozenSet
 
-# Import các biến cấu hình từ file config.py
-from .config import WP_API_URL, WP_CONSUMER_KEY, WP_CONSUMER_SECRET
+# Client upstream dùng chung cho các lời gọi tới WordPress
+from .upstream import wp_get, wp_get_revalidated
+from .cache import catalog_cache, accommodation_type_cache
+from .config import WP_PAGE_FANOUT, WP_MAX_PAGES
+from .responses import FastJSONResponse, dumps
+from .logger import get_logger
 
 # Định nghĩa router cho các endpoint phòng nghỉ
 router = APIRouter(tags=["accommodations"])
+log = get_logger("accommodation")
 
-def _process_accommodation_data(raw_data: Dict[str, Any]) -> Dict[str, Any]:
+# Các phần trong "accommodation_type" có thể chọn bằng fields=; id và title luôn được trả về
+ROOM_TYPE_PARTS = ("summary", "details", "images", "amenities", "services")
+ALL_PARTS: FrozenSet[str] = frozenset(ROOM_TYPE_PARTS)
+# view=summary: chỉ những gì màn hình danh sách phòng cần (tên, sức chứa, giá)
+SUMMARY_PARTS: FrozenSet[str] = frozenset({"details"})
+
+def _embedded_room_type(raw_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Lấy đối tượng loại phòng đầu tiên trong trường "_embedded" (nếu có).
+    """
+    embedded_data = raw_data.get("_embedded", {})
+    if not isinstance(embedded_data, dict):
+        return None
+    accommodation_type_list = embedded_data.get("accommodation_type_id", [])
+    if isinstance(accommodation_type_list, list) and accommodation_type_list:
+        return accommodation_type_list[0]
+    return None
+
+
+async def _fetch_accommodation_type(room_type_id: int) -> Optional[Dict[str, Any]]:
+    """
+    Lấy dữ liệu một loại phòng từ WordPress API (dùng khi truy vấn gộp không trả về đủ).
+    """
+    try:
+        room_type_response = await wp_get(f"/accommodation_types/{room_type_id}", route="accommodation_type")
+        if room_type_response.status_code == 200:
+            return room_type_response.json()
+        log.warning("wp_api_error", route="accommodation_type", room_type_id=room_type_id,
+                    status=room_type_response.status_code, body=room_type_response.text)
+    except Exception as e:
+        log.warning("wp_connection_error", route="accommodation_type", room_type_id=room_type_id, error=str(e))
+    return None
+
+
+async def _resolve_accommodation_types(raw_accommodations: List[Dict[str, Any]]) -> Dict[Any, Dict[str, Any]]:
+    """
+    Thu thập các accommodation_type_id khác nhau của những phòng không có dữ liệu nhúng,
+    lấy chúng bằng một truy vấn gộp `include=` (và gọi song song cho các ID còn thiếu),
+    rồi ghi nhớ vào cache để dùng lại giữa các request.
+    Các mục đã hết hạn trong cache được lấy lại cùng truy vấn gộp; bản cũ chỉ được dùng
+    khi không lấy lại được (WordPress lỗi).
+    """
+    wanted = {
+        item.get("accommodation_type_id")
+        for item in raw_accommodations
+        if _embedded_room_type(item) is None and item.get("accommodation_type_id")
+    }
+
+    room_types: Dict[Any, Dict[str, Any]] = {}
+    stale: Dict[Any, Dict[str, Any]] = {}
+    missing = []
+    for room_type_id in wanted:
+        cached = accommodation_type_cache.get(room_type_id)
+        if cached is not None:
+            room_types[room_type_id] = cached
+            continue
+        missing.append(room_type_id)
+        cached = accommodation_type_cache.get(room_type_id, allow_stale=True)
+        if cached is not None:
+            stale[room_type_id] = cached
+
+    if missing:
+        # 1) Một truy vấn gộp cho tất cả các loại phòng còn thiếu hoặc đã hết hạn
+        fetched = False
+        try:
+            response = await wp_get(
+                "/accommodation_types",
+                route="accommodation_types",
+                params={"include": ",".join(str(i) for i in missing), "per_page": 100},
+            )
+            if response.status_code == 200:
+                fetched = True
+                by_id = {str(item.get("id")): item for item in response.json() if isinstance(item, dict)}
+                for room_type_id in missing:
+                    if str(room_type_id) in by_id:
+                        room_types[room_type_id] = by_id[str(room_type_id)]
+            else:
+                log.warning("wp_api_error", route="accommodation_types", room_type_ids=missing,
+                            status=response.status_code, body=response.text)
+        except Exception as e:
+            log.warning("wp_connection_error", route="accommodation_types", room_type_ids=missing, error=str(e))
+
+        # 2) Gọi song song cho những ID mà truy vấn gộp không trả về
+        #    (nếu truy vấn gộp lỗi, các ID còn bản cũ dùng luôn bản cũ thay vì gọi từng cái)
+        remaining = [i for i in missing if i not in room_types and (fetched or i not in stale)]
+        if remaining:
+            results = await asyncio.gather(*(_fetch_accommodation_type(i) for i in remaining))
+            for room_type_id, data in zip(remaining, results):
+                if isinstance(data, dict):
+                    room_types[room_type_id] = data
+
+        for room_type_id in missing:
+            if room_type_id in room_types:
+                accommodation_type_cache.set(room_type_id, room_types[room_type_id])
+            elif room_type_id in stale:
+                room_types[room_type_id] = stale[room_type_id]
+
+    return room_types
+
+
+def _build_room_type(room_type_data: Dict[str, Any], parts: FrozenSet[str] = ALL_PARTS) -> Dict[str, Any]:
+    """
+    Trích xuất các trường cần thiết từ một loại phòng (không bao gồm mô tả ngắn của từng phòng).
+    Chỉ những phần có trong 'parts' mới được xử lý.
+    """
+    built: Dict[str, Any] = {
+        "id": room_type_data.get("id"),
+        "title": room_type_data.get("title", ""),
+    }
+
+    if "details" in parts:
+        prices_start_at = room_type_data.get("price", {}).get("regular_price_label", "Giá chưa xác định")
+        built["details"] = {
+            "adults": room_type_data.get("adults"),
+            "children": room_type_data.get("children"),
+            "size_sqft": room_type_data.get("size"),
+            "prices_start_at": prices_start_at
+        }
+
+    # Trích xuất các URL hình ảnh
+    if "images" in parts:
+        built["images"] = [item.get("src", "") for item in room_type_data.get("images", []) if isinstance(item, dict)]
+
+    # Xử lý danh sách tiện nghi và dịch vụ
+    if "amenities" in parts:
+        built["amenities"] = [item.get("title", "") for item in room_type_data.get("amenities", []) if isinstance(item, dict)]
+    if "services" in parts:
+        built["services"] = [item.get("title", "") for item in room_type_data.get("services", []) if isinstance(item, dict)]
+
+    return built
+
+
+def _process_accommodation_data(
+    raw_data: Dict[str, Any],
+    room_types: Dict[Any, Dict[str, Any]],
+    built_room_types: Dict[Any, Dict[str, Any]],
+    parts: FrozenSet[str] = ALL_PARTS,
+) -> Dict[str, Any]:
     """
     Hàm helper để xử lý và tinh gọn dữ liệu từ một phòng nghỉ.
+    'room_types' là các loại phòng đã được lấy trước bởi _resolve_accommodation_types,
+    'built_room_types' ghi nhớ phần loại phòng đã xử lý để mỗi loại chỉ xử lý một lần,
+    'parts' là các phần của "accommodation_type" cần trả về (xem ROOM_TYPE_PARTS).
     """
     try:
         # Thêm kiểm tra an toàn để đảm bảo raw_data là một dictionary
         if not isinstance(raw_data, dict):
-            print(f"Lỗi: Dữ liệu phòng nghỉ không phải là dictionary: {raw_data}")
+            log.warning("accommodation_not_dict", route="accommodations", raw_type=type(raw_data).__name__)
             return None
 
         # Lấy thông tin chính từ đối tượng phòng nghỉ
@@ -23,26 +169,10 @@ def _process_accommodation_data(raw_data: Dict[str, Any]) -> Dict[str, Any]:
         title = raw_data.get("title", "")
         status = raw_data.get("status", "")
 
-        # Lấy thông tin chi tiết từ trường "_embedded"
-        embedded_data = raw_data.get("_embedded", {})
-        accommodation_type_list = embedded_data.get("accommodation_type_id", [])
-
-        # Lấy đối tượng loại phòng đầu tiên và kiểm tra an toàn
-        room_type_data = None
-        if isinstance(accommodation_type_list, list) and accommodation_type_list:
-            room_type_data = accommodation_type_list[0]
-        elif raw_data.get("accommodation_type_id"):
-            # Nếu không có dữ liệu nhúng, lấy ID từ cấp cao nhất và tạo URL để lấy dữ liệu
-            room_type_id = raw_data.get("accommodation_type_id")
-            try:
-                room_type_url = f"{WP_API_URL}/accommodation_types/{room_type_id}"
-                room_type_response = requests.get(room_type_url, auth=(WP_CONSUMER_KEY, WP_CONSUMER_SECRET), timeout=10)
-                if room_type_response.status_code == 200:
-                    room_type_data = room_type_response.json()
-                else:
-                    print(f"Lỗi khi lấy dữ liệu loại phòng {room_type_id}: {room_type_response.text}")
-            except Exception as e:
-                print(f"Lỗi kết nối khi lấy dữ liệu loại phòng {room_type_id}: {e}")
+        # Lấy đối tượng loại phòng: ưu tiên dữ liệu nhúng, nếu không thì dùng dữ liệu đã lấy trước
+        room_type_data = _embedded_room_type(raw_data)
+        if room_type_data is None and raw_data.get("accommodation_type_id"):
+            room_type_data = room_types.get(raw_data.get("accommodation_type_id"))
 
         # Xử lý trường hợp không có dữ liệu loại phòng
         if not room_type_data or not isinstance(room_type_data, dict):
@@ -52,105 +182,296 @@ def _process_accommodation_data(raw_data: Dict[str, Any]) -> Dict[str, Any]:
                 "title": title,
                 "accommodation_type": None
             }
-        
-        # Trích xuất các trường cần thiết từ loại phòng
-        room_type_id = room_type_data.get("id")
-        room_type_title = room_type_data.get("title", "")
-        adults = room_type_data.get("adults")
-        children = room_type_data.get("children")
-        size_sqft = room_type_data.get("size")
-        prices_start_at = room_type_data.get("price", {}).get("regular_price_label", "Giá chưa xác định")
-        
-        # Lấy thêm thông tin mô tả ngắn
-        excerpt = raw_data.get("excerpt", "")
 
-        # Xử lý danh sách tiện nghi và dịch vụ
-        amenities = [item.get("title", "") for item in room_type_data.get("amenities", []) if isinstance(item, dict)]
-        services = [item.get("title", "") for item in room_type_data.get("services", []) if isinstance(item, dict)]
+        room_type_id = room_type_data.get("id")
+        built = built_room_types.get(room_type_id)
+        if built is None:
+            built = _build_room_type(room_type_data, parts)
+            built_room_types[room_type_id] = built
 
-        # Trích xuất các URL hình ảnh
-        images = [item.get("src", "") for item in room_type_data.get("images", []) if isinstance(item, dict)]
+        # Xây dựng cấu trúc JSON mới, gọn gàng hơn (theo thứ tự của ROOM_TYPE_PARTS)
+        accommodation_type = {"id": built["id"], "title": built["title"]}
+        for part in ROOM_TYPE_PARTS:
+            if part not in parts:
+                continue
+            if part == "summary":
+                # Mô tả ngắn nằm trên từng phòng, không phải trên loại phòng
+                accommodation_type["summary"] = raw_data.get("excerpt", "")
+            else:
+                accommodation_type[part] = built[part]
 
-        # Xây dựng cấu trúc JSON mới, gọn gàng hơn
         return {
             "id": accommodation_id,
             "status": status,
             "title": title,
-            "accommodation_type": {
-                "id": room_type_id,
-                "title": room_type_title,
-                "summary": excerpt,
-                "details": {
-                    "adults": adults,
-                    "children": children,
-                    "size_sqft": size_sqft,
-                    "prices_start_at": prices_start_at
-                },
-                "images": images,
-                "amenities": amenities,
-                "services": services
-            }
+            "accommodation_type": accommodation_type
         }
     except Exception as e:
-        print(f"Lỗi khi xử lý dữ liệu phòng nghỉ: {e}, dữ liệu gốc: {raw_data}")
+        # Chỉ ghi id của phòng thay vì toàn bộ dữ liệu gốc
+        log.error("accommodation_process_error", route="accommodations", accommodation_id=raw_data.get("id"), error=str(e))
         return None
 
-@router.get("/accommodations/", summary="Lấy danh sách các phòng nghỉ riêng lẻ")
-def get_accommodations():
+def _page_params(page: int, per_page: int, parts: FrozenSet[str]) -> Dict[str, Any]:
+    """
+    Dạng đầy đủ dùng _embed (loại phòng nhúng trong từng phòng). Khi chỉ cần một phần
+    (fields=/view=summary), bỏ _embed và chỉ lấy các trường cần thiết bằng _fields; loại phòng
+    được lấy riêng bằng một truy vấn gộp và dùng lại từ cache.
     """
-    Lấy danh sách tất cả các phòng nghỉ riêng lẻ từ API WordPress, với các tham số
-    _embed và per_page=100.
+    if parts == ALL_PARTS:
+        return {"_embed": "", "per_page": per_page, "page": page}
+    wp_fields = ["id", "title", "status", "accommodation_type_id"]
+    if "summary" in parts:
+        wp_fields.append("excerpt")
+    return {"_fields": ",".join(wp_fields), "per_page": per_page, "page": page}
+
+
+class _Page:
     """
+    Một trang phòng nghỉ từ WordPress: các phòng hợp lệ và tổng số trang.
+    Trang được lưu cùng ETag/Last-Modified (xem wp_get_revalidated); 'processed' giữ kết quả đã xử lý
+    theo từng 'parts' cùng các loại phòng đã dùng, để khi WordPress trả về 304 không phải xử lý lại.
+    """
+    __slots__ = ("items", "total_pages", "processed")
+
+    def __init__(self, items: List[Dict[str, Any]], total_pages: int):
+        self.items = items
+        self.total_pages = total_pages
+        self.processed: Dict[FrozenSet[str], Tuple[Dict[Any, Dict[str, Any]], List[Dict[str, Any]]]] = {}
+
+
+def _total_pages(response) -> Optional[int]:
+    try:
+        return min(int(response.headers["X-WP-TotalPages"]), WP_MAX_PAGES)
+    except (KeyError, ValueError):
+        return None
+
+
+def _update_total_pages(stored: _Page, response) -> None:
+    """
+    Khi WordPress trả về 304, nội dung trang không đổi nhưng tổng số trang có thể đã tăng/giảm
+    (thêm/xóa phòng ở các trang sau): cập nhật theo X-WP-TotalPages của response 304.
+    """
+    total_pages = _total_pages(response)
+    if total_pages is not None:
+        stored.total_pages = total_pages
+
+
+def _parse_accommodations_page(page: int, response) -> _Page:
+    if response.status_code != 200:
+        log.warning("wp_api_error", route="accommodations", page=page, status=response.status_code, body=response.text)
+        raise HTTPException(status_code=response.status_code, detail={"message": response.text})
+
     try:
-        url = f"{WP_API_URL}/accommodations?_embed&per_page=100"
-        
-        response = requests.get(
-            url,
-            auth=(WP_CONSUMER_KEY, WP_CONSUMER_SECRET),
-            timeout=20
+        raw_accommodations = response.json()
+    except ValueError as e:
+        log.warning("wp_invalid_json", route="accommodations", page=page, body=response.text)
+        raise HTTPException(
+            status_code=500,
+            detail={"message": f"Lỗi khi giải mã phản hồi JSON từ WordPress API: {e}. Nội dung phản hồi có thể không phải JSON."}
         )
 
-        if response.status_code != 200:
-            print(f"Lỗi WP API {response.status_code}: {response.text}")
-            raise HTTPException(status_code=response.status_code, detail={"message": response.text})
+    # Xử lý trường hợp phản hồi là một dictionary thay vì một list
+    if isinstance(raw_accommodations, dict):
+        raw_accommodations = [raw_accommodations]
 
-        try:
-            raw_accommodations = response.json()
-        except requests.exceptions.JSONDecodeError as e:
-            print(f"Lỗi: Phản hồi từ WordPress không phải JSON. Nội dung thô: {response.text}")
-            raise HTTPException(
-                status_code=500,
-                detail={"message": f"Lỗi khi giải mã phản hồi JSON từ WordPress API: {e}. Nội dung phản hồi có thể không phải JSON."}
-            )
-        
-        # Xử lý trường hợp phản hồi là một dictionary thay vì một list
-        if isinstance(raw_accommodations, dict):
-            raw_accommodations = [raw_accommodations]
-        
-        # Thêm kiểm tra an toàn mới để đảm bảo phản hồi là một danh sách
-        if not isinstance(raw_accommodations, list):
-            raise HTTPException(
-                status_code=500,
-                detail={"message": "Phản hồi từ WordPress API không phải là một danh sách hợp lệ."}
-            )
-        
-        # Lọc bỏ các mục không phải dictionary trước khi xử lý
-        valid_accommodations = [item for item in raw_accommodations if isinstance(item, dict)]
-
-        # Áp dụng hàm xử lý cho từng đối tượng phòng nghỉ và lọc bỏ các giá trị None
-        processed_accommodations = [
-            _process_accommodation_data(item) for item in valid_accommodations
-        ]
-        
-        # Lọc bỏ các mục None nếu có (do lỗi dữ liệu)
-        return [item for item in processed_accommodations if item is not None]
-    
-    except requests.exceptions.JSONDecodeError as e:
-        # Xử lý trường hợp phản hồi không phải JSON
+    # Thêm kiểm tra an toàn mới để đảm bảo phản hồi là một danh sách
+    if not isinstance(raw_accommodations, list):
         raise HTTPException(
             status_code=500,
-            detail={"message": f"Lỗi khi giải mã phản hồi JSON từ WordPress API: {e}"}
+            detail={"message": "Phản hồi từ WordPress API không phải là một danh sách hợp lệ."}
         )
+
+    # Lọc bỏ các mục không phải dictionary trước khi xử lý
+    valid_accommodations = [item for item in raw_accommodations if isinstance(item, dict)]
+    return _Page(valid_accommodations, _total_pages(response) or 1)
+
+
+async def _fetch_accommodations_page(page: int, per_page: int, parts: FrozenSet[str] = ALL_PARTS) -> _Page:
+    """
+    Lấy một trang phòng nghỉ từ API WordPress (có _embed nếu cần dạng đầy đủ).
+    Khi làm mới, trang được yêu cầu có điều kiện (If-None-Match/If-Modified-Since): nếu WordPress
+    trả về 304 thì dùng lại trang đã tải (kèm kết quả đã xử lý) thay vì tải lại nội dung _embed.
+    """
+    return await wp_get_revalidated(
+        "/accommodations",
+        route="accommodations",
+        process=lambda response: _parse_accommodations_page(page, response),
+        params=_page_params(page, per_page, parts),
+        not_modified=_update_total_pages,
+    )
+
+
+async def _iter_remaining_pages(
+    total_pages: int, per_page: int, parts: FrozenSet[str] = ALL_PARTS
+) -> AsyncIterator[Tuple[int, _Page]]:
+    """
+    Lấy song song các trang 2..total_pages (giới hạn bởi WP_PAGE_FANOUT) và trả về
+    (số trang, trang) ngay khi từng trang tải xong.
+    """
+    semaphore = asyncio.Semaphore(WP_PAGE_FANOUT)
+
+    async def fetch(page: int) -> Tuple[int, _Page]:
+        async with semaphore:
+            return page, await _fetch_accommodations_page(page, per_page, parts)
+
+    tasks = [asyncio.ensure_future(fetch(page)) for page in range(2, total_pages + 1)]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+def _same_room_types(used: Dict[Any, Dict[str, Any]], current: Dict[Any, Dict[str, Any]]) -> bool:
+    # Cache loại phòng trả về cùng một đối tượng cho đến khi được làm mới
+    return used.keys() == current.keys() and all(current[key] is value for key, value in used.items())
+
+
+async def _process_accommodations(
+    page: _Page,
+    built_room_types: Dict[Any, Dict[str, Any]],
+    parts: FrozenSet[str] = ALL_PARTS,
+) -> List[Dict[str, Any]]:
+    """
+    Xử lý một trang phòng nghỉ và lọc bỏ các mục lỗi. Nếu trang (và các loại phòng nó dùng)
+    không đổi kể từ lần xử lý trước, trả lại kết quả cũ.
+    """
+    # Lấy trước tất cả các loại phòng còn thiếu (một lần cho cả trang)
+    room_types = await _resolve_accommodation_types(page.items)
+
+    previous = page.processed.get(parts)
+    if previous is not None and _same_room_types(previous[0], room_types):
+        return previous[1]
+
+    # Áp dụng hàm xử lý cho từng đối tượng phòng nghỉ
+    processed_accommodations = [
+        _process_accommodation_data(item, room_types, built_room_types, parts) for item in page.items
+    ]
+
+    # Lọc bỏ các mục None nếu có (do lỗi dữ liệu)
+    result = [item for item in processed_accommodations if item is not None]
+    page.processed[parts] = (room_types, result)
+    return result
+
+
+def _parse_parts(view: str, fields: Optional[str]) -> FrozenSet[str]:
+    """
+    fields= (danh sách các phần của accommodation_type, cách nhau bởi dấu phẩy) được ưu tiên hơn view=.
+    """
+    if fields is None:
+        return SUMMARY_PARTS if view == "summary" else ALL_PARTS
+    parts = frozenset(f.strip() for f in fields.split(",") if f.strip())
+    unknown = parts - ALL_PARTS
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Trường không hợp lệ: {', '.join(sorted(unknown))}. Có thể chọn: {', '.join(ROOM_TYPE_PARTS)}",
+        )
+    return parts
+
+
+def _cache_key(all_pages: bool, per_page: int, parts: FrozenSet[str]) -> Tuple:
+    if parts == ALL_PARTS:
+        return ("accommodations", all_pages, per_page)
+    return ("accommodations", all_pages, per_page, tuple(sorted(parts)))
+
+
+async def _load_accommodations(
+    all_pages: bool, per_page: int, parts: FrozenSet[str] = ALL_PARTS
+) -> List[Dict[str, Any]]:
+    """
+    Lấy danh sách các phòng nghỉ riêng lẻ từ API WordPress rồi xử lý từng phòng.
+    Nếu all_pages=True, các trang còn lại được tải song song dựa trên X-WP-TotalPages.
+    """
+    try:
+        first = await _fetch_accommodations_page(1, per_page, parts)
+        pages: Dict[int, _Page] = {1: first}
+
+        if all_pages and first.total_pages > 1:
+            # Ghép các trang theo đúng thứ tự, dù chúng tải xong theo thứ tự bất kỳ
+            async for number, page in _iter_remaining_pages(first.total_pages, per_page, parts):
+                pages[number] = page
+
+        built_room_types: Dict[Any, Dict[str, Any]] = {}
+        accommodations: List[Dict[str, Any]] = []
+        for number in sorted(pages):
+            accommodations.extend(await _process_accommodations(pages[number], built_room_types, parts))
+        return accommodations
+
+    except HTTPException:
+        raise
     except Exception as e:
         # Xử lý các lỗi khác
         raise HTTPException(status_code=500, detail={"message": str(e)})
+
+
+async def _stream_accommodations(
+    all_pages: bool, per_page: int, parts: FrozenSet[str] = ALL_PARTS
+) -> AsyncIterator[bytes]:
+    """
+    Trả về từng phòng nghỉ đã xử lý dưới dạng NDJSON (mỗi dòng một đối tượng JSON)
+    ngay khi trang chứa nó được tải xong.
+    """
+    cache_key = _cache_key(all_pages, per_page, parts)
+    cached = catalog_cache.get(cache_key, allow_stale=True)
+    if cached is not None:
+        for item in cached:
+            yield dumps(item) + b"\n"
+        return
+
+    built_room_types: Dict[Any, Dict[str, Any]] = {}
+    try:
+        first = await _fetch_accommodations_page(1, per_page, parts)
+        for item in await _process_accommodations(first, built_room_types, parts):
+            yield dumps(item) + b"\n"
+
+        if all_pages and first.total_pages > 1:
+            async for _, page in _iter_remaining_pages(first.total_pages, per_page, parts):
+                for item in await _process_accommodations(page, built_room_types, parts):
+                    yield dumps(item) + b"\n"
+    except Exception as e:
+        # Header đã được gửi nên không thể đổi status code; báo lỗi bằng một dòng cuối
+        detail = e.detail if isinstance(e, HTTPException) else str(e)
+        log.error("accommodations_stream_error", route="accommodations", detail=detail)
+        yield dumps({"error": detail}) + b"\n"
+
+
+async def cached_accommodations(
+    parts: FrozenSet[str] = ALL_PARTS, all_pages: bool = False, per_page: int = 100
+) -> List[Dict[str, Any]]:
+    """
+    Danh sách phòng nghỉ đã xử lý từ cache danh mục (tải lại từ WordPress khi hết hạn).
+    """
+    return await catalog_cache.get_or_load(
+        _cache_key(all_pages, per_page, parts),
+        lambda: _load_accommodations(all_pages, per_page, parts),
+    )
+
+
+@router.get("/accommodations/", summary="Lấy danh sách các phòng nghỉ riêng lẻ")
+async def get_accommodations(
+    all_pages: bool = Query(False, description="Lấy tất cả các trang thay vì chỉ trang đầu"),
+    per_page: int = Query(100, ge=1, le=100, description="Số phòng trên mỗi trang WordPress"),
+    stream: bool = Query(False, description="Trả về dạng NDJSON, mỗi phòng một dòng"),
+    view: str = Query("full", pattern="^(full|summary)$", description="summary: chỉ id, tên và thông tin giá/sức chứa"),
+    fields: Optional[str] = Query(
+        None, description="Các phần của accommodation_type cần trả về: summary,details,images,amenities,services"
+    ),
+):
+    """
+    Lấy danh sách các phòng nghỉ riêng lẻ (đã xử lý) từ cache danh mục,
+    tải lại từ API WordPress khi cache hết hạn. Với stream=true, kết quả được
+    trả về dạng NDJSON ngay khi từng trang được tải.
+    Với view=summary hoặc fields=, chỉ các phần được chọn mới được xử lý và WordPress
+    được gọi không kèm _embed (loại phòng lấy từ cache).
+    """
+    parts = _parse_parts(view, fields)
+    if stream:
+        return StreamingResponse(
+            _stream_accommodations(all_pages, per_page, parts),
+            media_type="application/x-ndjson",
+        )
+
+    # Dữ liệu đã là dict/list thuần nên trả thẳng FastJSONResponse (bỏ qua jsonable_encoder)
+    return FastJSONResponse(await cached_accommodations(parts, all_pages, per_page))
@@ -0,0 +1,114 @@
+# routers/admin.py
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request
+from typing import Optional
+
+from .config import ADMIN_TOKEN
+from .cache import CACHES
+from .snapshot import SNAPSHOTS
+from . import admission, resilience, search
+
+# Định nghĩa router cho các endpoint quản trị nội bộ
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """
+    Dependency kiểm tra token quản trị trong header X-Admin-Token.
+    """
+    if not ADMIN_TOKEN or x_admin_token != ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Không có quyền truy cập.")
+
+
+@router.get("/cache", summary="Thống kê các cache", dependencies=[Depends(require_admin)])
+def get_cache_stats():
+    """
+    Trả về số lần hit/miss/refresh của từng cache để theo dõi tỷ lệ hit.
+    """
+    return [cache.stats() for cache in CACHES.values()]
+
+
+@router.post("/cache/invalidate", summary="Xóa cache", dependencies=[Depends(require_admin)])
+def invalidate_cache(
+    name: Optional[str] = Query(None, description="Tên cache cần xóa (bỏ trống để xóa tất cả)")
+):
+    """
+    Xóa toàn bộ dữ liệu của một cache (hoặc tất cả các cache).
+    """
+    if name is not None and name not in CACHES:
+        raise HTTPException(status_code=404, detail=f"Không tìm thấy cache '{name}'")
+
+    targets = [CACHES[name]] if name is not None else list(CACHES.values())
+    return {cache.name: cache.invalidate() for cache in targets}
+
+
+@router.get("/snapshots", summary="Thống kê các snapshot response", dependencies=[Depends(require_admin)])
+def get_snapshot_stats():
+    """
+    Trả về ETag hiện tại và số lần dựng lại của từng snapshot.
+    """
+    return [
+        {
+            "name": snapshot.name,
+            "etag": snapshot._built.etag if snapshot._built else None,
+            "builds": snapshot.builds,
+        }
+        for snapshot in SNAPSHOTS.values()
+    ]
+
+
+@router.post("/snapshots/invalidate", summary="Xóa snapshot response", dependencies=[Depends(require_admin)])
+def invalidate_snapshots(
+    name: Optional[str] = Query(None, description="Tên snapshot cần xóa (bỏ trống để xóa tất cả)")
+):
+    """
+    Buộc dựng lại snapshot ở request tiếp theo (dùng khi dữ liệu được sửa trực tiếp trong database).
+    """
+    if name is not None and name not in SNAPSHOTS:
+        raise HTTPException(status_code=404, detail=f"Không tìm thấy snapshot '{name}'")
+
+    targets = [SNAPSHOTS[name]] if name is not None else list(SNAPSHOTS.values())
+    for snapshot in targets:
+        snapshot.invalidate()
+    return {"invalidated": [snapshot.name for snapshot in targets]}
+
+
+@router.get("/upstream", summary="Trạng thái circuit breaker và timeout upstream", dependencies=[Depends(require_admin)])
+def get_upstream_stats():
+    """
+    Trả về trạng thái circuit breaker, timeout đang dùng và độ trễ gần đây của từng endpoint WordPress.
+    """
+    return resilience.stats()
+
+
+@router.get("/admission", summary="Trạng thái kiểm soát tải", dependencies=[Depends(require_admin)])
+def get_admission_stats():
+    """
+    Trả về số request đang chạy, đang chờ và đã bị từ chối của từng giới hạn (proxy, upstream, theo client).
+    """
+    return admission.stats()
+
+
+@router.get("/search", summary="Thống kê chỉ mục tìm kiếm", dependencies=[Depends(require_admin)])
+def get_search_stats():
+    """
+    Trả về số tài liệu, số từ và trạng thái tải của từng nguồn trong chỉ mục tìm kiếm.
+    """
+    return search.stats()
+
+
+@router.post("/search/reload", summary="Tải lại chỉ mục tìm kiếm", dependencies=[Depends(require_admin)])
+def reload_search():
+    """
+    Buộc tải lại toàn bộ các nguồn ở lần tìm kiếm tiếp theo (dùng khi dữ liệu được sửa trực tiếp trong database).
+    """
+    for source in search.SOURCES.values():
+        source.stale = True
+    return {"reloading": list(search.SOURCES)}
+
+
+@router.get("/startup", summary="Thời gian khởi động", dependencies=[Depends(require_admin)])
+def get_startup_timings(request: Request):
+    """
+    Trả về thời gian import và khởi động của tiến trình hiện tại (cold start).
+    """
+    return getattr(request.app.state, "boot_timings", None)
@@ -0,0 +1,281 @@
+# routers/admission.py
+import asyncio
+import math
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional
+
+from .config import (
+    ADMISSION,
+    ADMISSION_PROXY_PREFIXES,
+    ADMISSION_CLIENT_RATE,
+    ADMISSION_CLIENT_BURST,
+    ADMISSION_CLIENT_MAXSIZE,
+    ADMISSION_TRUST_FORWARDED,
+    ADMISSION_PROXY_CONCURRENCY,
+    ADMISSION_UPSTREAM_CONCURRENCY,
+    ADMISSION_QUEUE_SIZE,
+    ADMISSION_QUEUE_TIMEOUT,
+)
+from .metrics import observe_queue_wait
+from .resilience import UpstreamUnavailable
+from .responses import dumps
+from .logger import get_logger
+
+log = get_logger("admission")
+
+# Tất cả các giới hạn đồng thời đã tạo, dùng cho endpoint quản trị
+GATES: Dict[str, "AdmissionGate"] = {}
+
+
+class Overloaded(UpstreamUnavailable):
+    """
+    Hàng đợi đã đầy hoặc request chờ quá ADMISSION_QUEUE_TIMEOUT: trả 503 ngay (kèm Retry-After).
+    Là một UpstreamUnavailable nên các cache danh mục vẫn trả dữ liệu cũ thay vì lỗi.
+    """
+
+    def __init__(self, gate: str, retry_after: int):
+        super().__init__(gate, retry_after, message="Máy chủ đang quá tải, vui lòng thử lại sau.")
+        self.gate = gate
+
+
+class AdmissionGate:
+    """
+    Giới hạn số việc chạy đồng thời, kèm hàng đợi có giới hạn:
+    - còn chỗ: chạy ngay;
+    - hết chỗ: chờ tối đa 'timeout' giây (theo thứ tự đến), quá hạn thì bị từ chối;
+    - hàng đợi đã có 'queue_size' request: từ chối ngay, không chờ.
+    Với shed=False chỉ giới hạn đồng thời (chờ không giới hạn) và đo thời gian chờ.
+    """
+
+    def __init__(self, name: str, limit: int, queue_size: int = ADMISSION_QUEUE_SIZE,
+                 timeout: float = ADMISSION_QUEUE_TIMEOUT, shed: bool = True):
+        self.name = name
+        self.limit = limit
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.shed = shed
+        self._semaphore = asyncio.Semaphore(limit)
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.queued = 0
+        self.shed_queue_full = 0
+        self.shed_timeout = 0
+        GATES[name] = self
+
+    def retry_after(self) -> int:
+        return max(1, math.ceil(self.timeout))
+
+    async def _acquire(self) -> None:
+        # ADMISSION=0: chỉ giới hạn đồng thời, chờ không giới hạn như một semaphore thường
+        if not ADMISSION or not self._semaphore.locked():
+            await self._semaphore.acquire()
+            return
+        if self.shed and self.waiting >= self.queue_size:
+            self.shed_queue_full += 1
+            observe_queue_wait(self.name, "shed", 0.0)
+            raise Overloaded(self.name, self.retry_after())
+
+        self.waiting += 1
+        self.queued += 1
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.timeout if self.shed else None)
+        except asyncio.TimeoutError:
+            self.shed_timeout += 1
+            observe_queue_wait(self.name, "shed", time.perf_counter() - started)
+            raise Overloaded(self.name, self.retry_after())
+        finally:
+            self.waiting -= 1
+        observe_queue_wait(self.name, "admitted", time.perf_counter() - started)
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        await self._acquire()
+        self.active += 1
+        self.admitted += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self._semaphore.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "limit": self.limit,
+            "shed": self.shed,
+            "active": self.active,
+            "waiting": self.waiting,
+            "queue_size": self.queue_size,
+            "timeout": self.timeout,
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "shed_queue_full": self.shed_queue_full,
+            "shed_timeout": self.shed_timeout,
+        }
+
+
+class _Bucket:
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, tokens: float, updated: float):
+        self.tokens = tokens
+        self.updated = updated
+
+
+class ClientLimiter:
+    """
+    Token bucket theo client: mỗi client có tối đa 'burst' token, nạp lại 'rate' token mỗi giây.
+    Chỉ giữ 'maxsize' client dùng gần nhất (LRU); client bị loại sẽ bắt đầu lại với bucket đầy.
+    """
+
+    def __init__(self, rate: float, burst: int, maxsize: int = ADMISSION_CLIENT_MAXSIZE):
+        self.rate = rate
+        self.burst = burst
+        self.maxsize = maxsize
+        self._buckets: "OrderedDict[str, _Bucket]" = OrderedDict()
+        self.allowed = 0
+        self.limited = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0 and self.burst > 0
+
+    def acquire(self, key: str) -> float:
+        """
+        Lấy một token cho client. Trả về 0 nếu được phép, ngược lại là số giây cần chờ.
+        """
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = _Bucket(float(self.burst), now)
+            while len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+            bucket.tokens = min(self.burst, bucket.tokens + (now - bucket.updated) * self.rate)
+            bucket.updated = now
+
+        if bucket.tokens >= 1:
+            bucket.tokens -= 1
+            self.allowed += 1
+            return 0.0
+        self.limited += 1
+        return (1 - bucket.tokens) / self.rate
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "rate": self.rate,
+            "burst": self.burst,
+            "clients": len(self._buckets),
+            "allowed": self.allowed,
+            "limited": self.limited,
+        }
+
+
+# Giới hạn dùng chung cho toàn bộ tiến trình. Chỉ cả request mới bị từ chối (ở middleware):
+# các lời gọi upstream bên trong một request (ví dụ ma trận phòng trống của /availability/batch)
+# chỉ chờ lượt, để request đã được nhận không thất bại từng phần.
+proxy_gate = AdmissionGate("proxy", ADMISSION_PROXY_CONCURRENCY)
+upstream_gate = AdmissionGate("upstream", ADMISSION_UPSTREAM_CONCURRENCY, shed=False)
+client_limiter = ClientLimiter(ADMISSION_CLIENT_RATE, ADMISSION_CLIENT_BURST)
+if ADMISSION and client_limiter.enabled and not ADMISSION_TRUST_FORWARDED:
+    log.warning("admission_client_limit_by_connection_ip", rate=ADMISSION_CLIENT_RATE,
+                hint="sau reverse proxy mọi client dùng chung một bucket; đặt ADMISSION_TRUST_FORWARDED=1")
+
+
+@asynccontextmanager
+async def upstream_slot() -> AsyncIterator[None]:
+    """
+    Giữ một chỗ trong giới hạn lời gọi upstream đồng thời (WordPress, Zalo).
+    """
+    if not ADMISSION:
+        yield
+        return
+    async with upstream_gate.slot():
+        yield
+
+
+def _header(scope, name: bytes) -> Optional[str]:
+    for key, value in scope.get("headers", []):
+        if key == name:
+            return value.decode("latin-1").strip()
+    return None
+
+
+def client_key(scope) -> str:
+    """
+    Nhận diện client theo IP kết nối. Không dùng header do client tự gửi (ví dụ id người dùng Zalo
+    chưa được xác thực), vì đổi giá trị là vượt được giới hạn và đẩy bucket của client khác ra khỏi LRU.
+    Khi ADMISSION_TRUST_FORWARDED=1, dùng IP cuối cùng trong X-Forwarded-For (do proxy phía trước
+    ghi vào; các IP phía trước nó do client tự khai).
+    """
+    if ADMISSION_TRUST_FORWARDED:
+        forwarded = _header(scope, b"x-forwarded-for")
+        if forwarded:
+            hop = forwarded.rsplit(",", 1)[-1].strip()
+            if hop:
+                return hop
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+def is_proxy_route(path: str) -> bool:
+    return path.startswith(ADMISSION_PROXY_PREFIXES)
+
+
+async def _reject(send, status_code: int, retry_after: int, detail: Dict[str, Any]) -> None:
+    body = dumps({"detail": detail})
+    await send({
+        "type": "http.response.start",
+        "status": status_code,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode("latin-1")),
+            (b"retry-after", str(retry_after).encode("latin-1")),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class AdmissionMiddleware:
+    """
+    Middleware ASGI kiểm soát tải cho các route proxy (gọi WordPress/Zalo):
+    giới hạn theo client (429) rồi giới hạn số request proxy đồng thời với hàng đợi có hạn (503).
+    Các route cục bộ đi thẳng vào app, không chờ sau các request proxy.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not is_proxy_route(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+
+        if client_limiter.enabled:
+            wait = client_limiter.acquire(client_key(scope))
+            if wait > 0:
+                retry_after = max(1, math.ceil(wait))
+                await _reject(send, 429, retry_after, {"message": "Quá nhiều yêu cầu, vui lòng thử lại sau."})
+                return
+
+        try:
+            async with proxy_gate.slot():
+                await self.app(scope, receive, send)
+        except Overloaded as e:
+            if e.gate != proxy_gate.name:
+                raise
+            log.info("admission_shed", route=scope["path"], gate=e.gate, waiting=proxy_gate.waiting)
+            await _reject(send, 503, proxy_gate.retry_after(), e.detail)
+
+
+def stats() -> Dict[str, Any]:
+    return {
+        "enabled": ADMISSION,
+        "proxy_prefixes": list(ADMISSION_PROXY_PREFIXES),
+        "clients": client_limiter.stats(),
+        "gates": {name: gate.stats() for name, gate in GATES.items()},
+    }
@@ -1,14 +1,23 @@
-from fastapi import APIRouter, HTTPException, Query
-import requests
+import asyncio
+from fastapi import APIRouter, Header, HTTPException, Query, Request
 
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import List, Optional, Union
 
 # Import các biến cấu hình từ file config.py
-from .config import WP_API_URL, WP_CONSUMER_KEY, WP_CONSUMER_SECRET, ROOM_TYPES_MAP
+from .config import (
+    ROOM_TYPES_MAP, WP_AVAILABILITY_CONCURRENCY, AVAILABILITY_BATCH_MAX, INVENTORY_MODE, CATALOG_CACHE_TTL,
+)
+from .upstream import wp_get, wp_get_revalidated, wp_post
+from .cache import catalog_cache, availability_cache
+from .resilience import UpstreamUnavailable
+from . import inventory, outbox, search
+from .responses import FastJSONResponse
+from .logger import get_logger
 
 # Định nghĩa router cho các endpoint đặt phòng
 router = APIRouter(prefix="/bookings", tags=["bookings"])
+log = get_logger("booking")
 
 # --- SCHEMAS (Định nghĩa cấu trúc dữ liệu cho request và response) ---
 class ReservedAccommodation(BaseModel):
@@ -31,46 +40,129 @@ class BookingCreate(BaseModel):
     customer: Customer
     notes: Optional[str] = None
 
+class DateRange(BaseModel):
+    check_in_date: str
+    check_out_date: str
+
+class AvailabilityBatchRequest(BaseModel):
+    rooms: List[Union[int, str]]      # tên loại phòng trong ROOM_TYPES_MAP hoặc ID
+    date_ranges: List[DateRange]
+    adults: int = 1
+    children: Optional[int] = 0
+    local: bool = False               # True: tính từ bản sao inventory cục bộ (như /availability/local)
+
+# Giới hạn số lời gọi kiểm tra phòng trống đồng thời tới WordPress
+_availability_semaphore = asyncio.Semaphore(WP_AVAILABILITY_CONCURRENCY)
+
 # --- ENDPOINTS (Đóng vai trò là proxy cho API WordPress) ---
+def _wp_booking_payload(booking: BookingCreate) -> dict:
+    """
+    Chuyển dữ liệu đặt phòng từ frontend sang payload của WordPress MPHB.
+    """
+    payload = booking.dict(exclude_none=True)
+
+    # Đảo ngược tên
+    swapped_first = booking.customer.last_name
+    swapped_last = booking.customer.first_name
+
+    payload["customer"]["first_name"] = swapped_first
+    payload["customer"]["last_name"] = swapped_last
+
+    # Cập nhật guest_name cho mỗi phòng
+    full_name = f"{swapped_last} {swapped_first}"
+    for ra in payload["reserved_accommodations"]:
+        ra["guest_name"] = full_name
+    return payload
+
+
+def _outbox_response(request: Request, submission: dict) -> FastJSONResponse:
+    """
+    202 khi đơn còn đang chờ gửi, 200 khi đã có kết quả cuối cùng; kèm URL để xem trạng thái.
+    """
+    status_url = str(request.url_for("get_booking_submission", idempotency_key=submission["idempotency_key"]))
+    done = submission["status"] in (outbox.SUCCEEDED, outbox.FAILED)
+    return FastJSONResponse(
+        status_code=200 if done else 202,
+        content={**submission, "status_url": status_url},
+        headers={"Location": status_url},
+    )
+
+
 @router.post("/", summary="Tạo đơn đặt phòng mới trên WordPress")
-def create_booking(booking: BookingCreate):
+async def create_booking(
+    booking: BookingCreate,
+    request: Request,
+    idempotency_key: Optional[str] = Header(None, max_length=255, description="Bật chế độ gửi bất đồng bộ qua outbox"),
+):
     """
     Endpoint này nhận dữ liệu đặt phòng từ frontend và chuyển tiếp đến API WordPress.
+    Ở INVENTORY_MODE="local", đơn trùng lịch theo bản sao cục bộ bị từ chối ngay (409);
+    ở "local_confirm", WordPress luôn là bên xác nhận cuối cùng.
 
+    Khi có header Idempotency-Key, đơn được ghi vào outbox và trả về 202 ngay cùng URL trạng thái;
+    worker nền gửi đơn tới WordPress (có thử lại). Gửi lại cùng key trả về kết quả của đơn ban đầu.
     """
-    try:
-        url = f"{WP_API_URL}/bookings"
-        payload = booking.dict(exclude_none=True)
+    if not outbox.is_enabled():
+        idempotency_key = None
 
-        # Đảo ngược tên
-        swapped_first = booking.customer.last_name
-        swapped_last = booking.customer.first_name
+    # Đơn gửi lại với key đã có không cần kiểm tra trùng lịch lần nữa (nó đã nằm trong bản sao)
+    known = bool(idempotency_key) and await outbox.get_status(idempotency_key) is not None
 
-        payload["customer"]["first_name"] = swapped_first
-        payload["customer"]["last_name"] = swapped_last
+    if INVENTORY_MODE == "local" and inventory.is_ready() and not known:
+        conflicts = inventory.find_conflicts(
+            [ra.dict() for ra in booking.reserved_accommodations],
+            booking.check_in_date,
+            booking.check_out_date,
+        )
+        if conflicts:
+            raise HTTPException(status_code=409, detail={"message": "Phòng đã được đặt trong khoảng ngày này.", "accommodations": conflicts})
 
-        # Cập nhật guest_name cho mỗi phòng
-        full_name = f"{swapped_last} {swapped_first}"
-        for ra in payload["reserved_accommodations"]:
-            ra["guest_name"] = full_name
+    if idempotency_key:
+        try:
+            submission, _ = await outbox.submit(idempotency_key, _wp_booking_payload(booking))
+        except outbox.IdempotencyConflict:
+            raise HTTPException(
+                status_code=422,
+                detail="Idempotency-Key này đã được dùng cho một đơn đặt phòng khác.",
+            )
+        return _outbox_response(request, submission)
 
-        print(f"Payload gửi tới WordPress: {payload}")
+    try:
+        payload = _wp_booking_payload(booking)
 
-        response = requests.post(
-            url,
-            json=payload,
-            auth=(WP_CONSUMER_KEY, WP_CONSUMER_SECRET),
-            timeout=20
-        )
+        log.debug("wp_booking_payload", route="create_booking", payload=payload)
+
+        response = await wp_post("/bookings", route="create_booking", json=payload)
         if response.status_code not in (200, 201):
-            print(f"Lỗi WP API {response.status_code}: {response.text}")
+            log.warning("wp_api_error", route="create_booking", status=response.status_code, body=response.text)
             raise HTTPException(status_code=response.status_code, detail=response.json())
-        return response.json()
+
+        created = response.json()
+        await inventory.record_booking(created)
+        return created
+    except UpstreamUnavailable:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+
+@router.get(
+    "/outbox/{idempotency_key}",
+    name="get_booking_submission",
+    summary="Trạng thái đơn đặt phòng gửi qua outbox",
+)
+async def get_booking_submission(idempotency_key: str, request: Request):
+    """
+    Trả về trạng thái của đơn gửi bằng Idempotency-Key: pending/sending (202),
+    succeeded kèm đơn WordPress đã tạo, hoặc failed kèm lỗi (200).
+    """
+    submission = await outbox.get_status(idempotency_key)
+    if submission is None:
+        raise HTTPException(status_code=404, detail=f"Không tìm thấy đơn với Idempotency-Key '{idempotency_key}'")
+    return _outbox_response(request, submission)
+
 @router.get("/", summary="Lấy danh sách các đơn đặt phòng từ WordPress")
-def get_bookings(
+async def get_bookings(
     status: Optional[str] = Query(None, description="Lọc theo trạng thái đặt phòng"),
     page: int = Query(1, description="Số trang"),
     per_page: int = Query(10, description="Số mục trên mỗi trang")
@@ -79,61 +171,174 @@ def get_bookings(
     Lấy danh sách các đơn đặt phòng với các tham số phân trang và lọc trạng thái.
     """
     try:
-        url = f"{WP_API_URL}/bookings"
         params = {"page": page, "per_page": per_page}
         if status:
             params["status"] = status
 
-        response = requests.get(
-            url,
-            params=params,
-            auth=(WP_CONSUMER_KEY, WP_CONSUMER_SECRET),
-            timeout=20
-        )
+        response = await wp_get("/bookings", route="bookings", params=params)
         if response.status_code != 200:
-            print(f"Lỗi WP API {response.status_code}: {response.text}")
+            log.warning("wp_api_error", route="bookings", status=response.status_code, body=response.text)
             raise HTTPException(status_code=response.status_code, detail=response.json())
-        return response.json()
+        return FastJSONResponse(response.json())
+    except UpstreamUnavailable:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# Các trường của một loại phòng; view=summary chỉ trả về id và title
+ACCOMMODATION_TYPE_FIELDS = ("id", "title", "adults", "children")
+ACCOMMODATION_TYPE_SUMMARY_FIELDS = ("id", "title")
+
+
+def _parse_accommodation_types(response) -> List[dict]:
+    if response.status_code != 200:
+        log.warning("wp_api_error", route="accommodation_types", status=response.status_code, body=response.text)
+        raise HTTPException(status_code=response.status_code, detail=response.json())
+
+    raw_data = response.json()
+
+    filtered_data = []
+    for item in raw_data:
+        filtered_data.append({
+            "id": item.get("id"),
+            "title": item.get("title"),
+            "adults": item.get("adults", 0),
+            "children": item.get("children", 0)
+        })
+
+    return filtered_data
+
+
+async def _load_accommodation_types() -> List[dict]:
+    """
+    Gọi WordPress API để lấy danh sách loại phòng và chỉ giữ lại id, title, adults, children.
+    _fields yêu cầu WordPress chỉ trả về các trường này (bỏ ảnh, tiện nghi, dịch vụ...).
+    Khi làm mới, nếu WordPress trả về 304 (ETag/Last-Modified không đổi) thì dùng lại danh sách đã lọc.
+    """
+    return await wp_get_revalidated(
+        "/accommodation_types",
+        route="accommodation_types",
+        process=_parse_accommodation_types,
+        params={"_fields": ",".join(ACCOMMODATION_TYPE_FIELDS)},
+    )
+
+async def cached_accommodation_types() -> List[dict]:
+    """
+    Danh sách loại phòng từ cache danh mục: chỉ gọi WordPress khi cache hết hạn.
+    """
+    return await catalog_cache.get_or_load("accommodation_types", _load_accommodation_types)
+
+# Tên loại phòng trong chỉ mục tìm kiếm (/api/search), tải lại theo TTL của cache danh mục
+search.register_source("room_types", cached_accommodation_types, fields=("title",), max_age=CATALOG_CACHE_TTL)
+
+def _select_fields(view: str, fields: Optional[str]) -> Optional[List[str]]:
+    """
+    Trả về danh sách trường cần giữ, hoặc None nếu cần tất cả.
+    """
+    if fields is None:
+        return list(ACCOMMODATION_TYPE_SUMMARY_FIELDS) if view == "summary" else None
+    selected = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in selected if f not in ACCOMMODATION_TYPE_FIELDS]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Trường không hợp lệ: {', '.join(unknown)}. Có thể chọn: {', '.join(ACCOMMODATION_TYPE_FIELDS)}",
+        )
+    return selected
+
+
 @router.get("/accommodation_types/", summary="Lấy danh sách các loại phòng")
-def get_accommodation_types():
+async def get_accommodation_types(
+    view: str = Query("full", pattern="^(full|summary)$", description="summary: chỉ id và title"),
+    fields: Optional[str] = Query(None, description="Các trường cần trả về: id,title,adults,children"),
+):
     """
     Lấy danh sách các loại phòng (accommodation types) từ WordPress API,
-    chỉ bao gồm id, title, adults, và children.
+    chỉ bao gồm id, title, adults, và children. Kết quả được lưu trong cache danh mục.
     """
+    selected = _select_fields(view, fields)
     try:
-        url = f"{WP_API_URL}/accommodation_types"
-        
-        response = requests.get(
-            url,
-            auth=(WP_CONSUMER_KEY, WP_CONSUMER_SECRET),
-            timeout=20
-        )
-
-        if response.status_code != 200:
-            print(f"Lỗi WP API {response.status_code}: {response.text}")
-            raise HTTPException(status_code=response.status_code, detail=response.json())
-        
-        raw_data = response.json()
-
-        filtered_data = []
-        for item in raw_data:
-            filtered_data.append({
-                "id": item.get("id"),
-                "title": item.get("title"),
-                "adults": item.get("adults", 0),
-                "children": item.get("children", 0)
-            })
-
-        return filtered_data
+        types = await cached_accommodation_types()
+        if selected is not None:
+            types = [{f: item.get(f) for f in selected} for item in types]
+        return FastJSONResponse(types)
+    except UpstreamUnavailable:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     
 
+async def _fetch_availability(
+    accommodation_type: int,
+    check_in_date: str,
+    check_out_date: str,
+    adults: int,
+    children: Optional[int],
+):
+    """
+    Kiểm tra phòng trống trên WordPress API. Các truy vấn giống nhau đang chạy đồng thời
+    chỉ gọi upstream một lần, và kết quả được giữ trong cache ngắn hạn.
+    """
+    params = {
+        "check_in_date": check_in_date,
+        "check_out_date": check_out_date,
+        "accommodation_type": accommodation_type,
+        "adults": adults,
+        "children": children,
+    }
+
+    async def load():
+        async with _availability_semaphore:
+            response = await wp_get("/bookings/availability/", route="availability", params=params)
+
+        # Xử lý lỗi nếu có
+        if response.status_code != 200:
+            log.warning("wp_api_error", route="availability", status=response.status_code, body=response.text)
+            raise HTTPException(status_code=response.status_code, detail=response.json())
+
+        # Trả về toàn bộ dữ liệu JSON từ API
+        return response.json()
+
+    key = (accommodation_type, check_in_date, check_out_date, adults, children)
+    return await availability_cache.get_or_load(key, load)
+
+
+def _check_inventory_ready() -> None:
+    if not inventory.is_ready():
+        raise HTTPException(
+            status_code=503,
+            detail="Bản sao inventory cục bộ chưa sẵn sàng (INVENTORY_MODE hoặc chưa đồng bộ xong).",
+        )
+
+
+def _local_availability(
+    accommodation_type: int,
+    check_in_date: str,
+    check_out_date: str,
+    adults: int,
+    children: Optional[int],
+):
+    try:
+        return inventory.local_availability(accommodation_type, check_in_date, check_out_date, adults, children)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _resolve_room_type(room) -> Optional[int]:
+    """
+    Chuyển tên loại phòng hoặc ID (số hoặc chuỗi số) thành ID trong ROOM_TYPES_MAP.
+    """
+    if isinstance(room, str):
+        if room in ROOM_TYPES_MAP:
+            return ROOM_TYPES_MAP[room]
+        if not room.isdigit():
+            return None
+        room = int(room)
+    return room if room in ROOM_TYPES_MAP.values() else None
+
+
 @router.get("/availability/", summary="Kiểm tra phòng trống")
-def get_room_availability(
+async def get_room_availability(
     check_in_date: str = Query(..., description="Ngày nhận phòng (YYYY-MM-DD)"),
     check_out_date: str = Query(..., description="Ngày trả phòng (YYYY-MM-DD)"),
     accommodation_title: str = Query(..., description="Tiêu đề loại phòng"),
@@ -149,30 +354,82 @@ def get_room_availability(
         if accommodation_type is None:
             raise HTTPException(status_code=400, detail=f"Không tìm thấy loại phòng '{accommodation_title}'")
 
-        # Xây dựng URL với các tham số từ query
-        url = (
-            f"{WP_API_URL}/bookings/availability/"
-            f"?check_in_date={check_in_date}"
-            f"&check_out_date={check_out_date}"
-            f"&accommodation_type={accommodation_type}"
-            f"&adults={adults}"
-            f"&children={children}"
-        )
+        return await _fetch_availability(accommodation_type, check_in_date, check_out_date, adults, children)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/availability/local", summary="Kiểm tra phòng trống từ bản sao inventory cục bộ")
+async def get_local_room_availability(
+    check_in_date: str = Query(..., description="Ngày nhận phòng (YYYY-MM-DD)"),
+    check_out_date: str = Query(..., description="Ngày trả phòng (YYYY-MM-DD)"),
+    accommodation_title: str = Query(..., description="Tiêu đề loại phòng"),
+    adults: int = Query(1, description="Số người lớn"),
+    children: Optional[int] = Query(0, description="Số trẻ em")
+):
+    """
+    Tính phòng trống từ bản sao inventory cục bộ (INVENTORY_MODE="local"/"local_confirm"),
+    không gọi WordPress. Kết quả có dạng riêng (source="local", available_count, accommodations)
+    và không có giá; /availability/ luôn trả về kết quả của WordPress.
+    """
+    accommodation_type = ROOM_TYPES_MAP.get(accommodation_title)
+    if accommodation_type is None:
+        raise HTTPException(status_code=400, detail=f"Không tìm thấy loại phòng '{accommodation_title}'")
+    _check_inventory_ready()
+    return _local_availability(accommodation_type, check_in_date, check_out_date, adults, children)
 
-        # Gửi yêu cầu GET tới API WordPress
-        response = requests.get(
-            url,
-            auth=(WP_CONSUMER_KEY, WP_CONSUMER_SECRET),
-            timeout=20
+
+@router.post("/availability/batch", summary="Kiểm tra phòng trống cho nhiều loại phòng và khoảng ngày")
+async def get_room_availability_batch(batch: AvailabilityBatchRequest):
+    """
+    Kiểm tra phòng trống cho mọi cặp (loại phòng, khoảng ngày) trong một request.
+    Các truy vấn được gửi song song tới WordPress (giới hạn bởi WP_AVAILABILITY_CONCURRENCY)
+    và trả về một ma trận: matrix[i][j] ứng với rooms[i] và date_ranges[j].
+    Lỗi của từng ô được trả về trong ô đó thay vì làm hỏng cả request.
+    Với "local": true, các ô được tính từ bản sao inventory cục bộ (như /availability/local).
+    """
+    if len(batch.rooms) * len(batch.date_ranges) > AVAILABILITY_BATCH_MAX:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Tối đa {AVAILABILITY_BATCH_MAX} cặp loại phòng/khoảng ngày mỗi request."
         )
 
-        # Xử lý lỗi nếu có
-        if response.status_code != 200:
-            print(f"Lỗi WP API {response.status_code}: {response.text}")
-            raise HTTPException(status_code=response.status_code, detail=response.json())
+    room_type_ids = []
+    for room in batch.rooms:
+        accommodation_type = _resolve_room_type(room)
+        if accommodation_type is None:
+            raise HTTPException(status_code=400, detail=f"Không tìm thấy loại phòng '{room}'")
+        room_type_ids.append(accommodation_type)
+    if batch.local:
+        _check_inventory_ready()
 
-        # Trả về toàn bộ dữ liệu JSON từ API
-        return response.json()
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-    
\ No newline at end of file
+    async def cell(accommodation_type: int, date_range: DateRange):
+        args = (accommodation_type, date_range.check_in_date, date_range.check_out_date, batch.adults, batch.children)
+        try:
+            if batch.local:
+                data = _local_availability(*args)
+            else:
+                data = await _fetch_availability(*args)
+            return {"data": data}
+        except HTTPException as e:
+            return {"error": {"status_code": e.status_code, "detail": e.detail}}
+        except Exception as e:
+            return {"error": {"status_code": 500, "detail": str(e)}}
+
+    cells = await asyncio.gather(*(
+        cell(accommodation_type, date_range)
+        for accommodation_type in room_type_ids
+        for date_range in batch.date_ranges
+    ))
+
+    columns = len(batch.date_ranges)
+    return {
+        "rooms": [
+            {"room": room, "accommodation_type": accommodation_type}
+            for room, accommodation_type in zip(batch.rooms, room_type_ids)
+        ],
+        "date_ranges": batch.date_ranges,
+        "matrix": [cells[i * columns:(i + 1) * columns] for i in range(len(room_type_ids))],
+    }
@@ -0,0 +1,205 @@
+# routers/cache.py
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+from .config import (
+    CATALOG_CACHE_TTL,
+    CATALOG_CACHE_STALE_TTL,
+    CATALOG_CACHE_MAXSIZE,
+    AVAILABILITY_CACHE_TTL,
+    ZALO_PHONE_CACHE_TTL,
+    ZALO_PHONE_CACHE_MAXSIZE,
+)
+from .logger import get_logger
+from .resilience import UpstreamUnavailable
+
+log = get_logger("cache")
+
+# Danh sách tất cả các cache đã tạo, dùng cho endpoint quản trị
+CACHES: Dict[str, "TTLCache"] = {}
+
+Loader = Callable[[], Awaitable[Any]]
+
+
+class _Entry:
+    __slots__ = ("value", "fresh_until", "stale_until")
+
+    def __init__(self, value: Any, fresh_until: float, stale_until: float):
+        self.value = value
+        self.fresh_until = fresh_until
+        self.stale_until = stale_until
+
+
+class TTLCache:
+    """
+    Cache trong bộ nhớ có TTL, giới hạn kích thước (LRU) và stale-while-revalidate:
+    - còn hạn: trả về ngay;
+    - hết hạn nhưng còn trong khoảng stale: trả dữ liệu cũ và làm mới ở nền (một task mỗi key);
+    - không có hoặc quá cũ: gọi loader, các yêu cầu đồng thời cùng key chỉ gọi upstream một lần.
+    Với fallback_on_unavailable=True, khi circuit breaker của upstream đang mở thì trả về
+    giá trị cũ còn giữ trong cache (kể cả đã quá khoảng stale) thay vì lỗi 503.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        ttl: float,
+        stale_ttl: float = 0,
+        maxsize: int = 128,
+        fallback_on_unavailable: bool = False,
+    ):
+        self.name = name
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.maxsize = maxsize
+        self.fallback_on_unavailable = fallback_on_unavailable
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self._refreshing: Dict[Hashable, asyncio.Task] = {}
+        # Tăng mỗi lần invalidate để bỏ qua kết quả của các lần tải bắt đầu trước đó
+        self._generation = 0
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.refresh_errors = 0
+        self.evictions = 0
+        self.fallbacks = 0
+        CACHES[name] = self
+
+    def get(self, key: Hashable, allow_stale: bool = False) -> Optional[Any]:
+        """
+        Đọc trực tiếp một giá trị (không gọi loader). Trả về None nếu không có.
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        now = time.monotonic()
+        if now < entry.fresh_until or (allow_stale and now < entry.stale_until):
+            self._entries.move_to_end(key)
+            return entry.value
+        return None
+
+    def set(self, key: Hashable, value: Any) -> None:
+        now = time.monotonic()
+        self._entries[key] = _Entry(value, now + self.ttl, now + self.ttl + self.stale_ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key: Optional[Hashable] = None) -> int:
+        """
+        Xóa một key (hoặc toàn bộ cache nếu key=None). Trả về số mục đã xóa.
+        """
+        self._generation += 1
+        if key is None:
+            count = len(self._entries)
+            self._entries.clear()
+            return count
+        return 1 if self._entries.pop(key, None) is not None else 0
+
+    async def get_or_load(self, key: Hashable, loader: Loader) -> Any:
+        entry = self._entries.get(key)
+        now = time.monotonic()
+        if entry is not None:
+            if now < entry.fresh_until:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return entry.value
+            if now < entry.stale_until:
+                self.stale_hits += 1
+                self._entries.move_to_end(key)
+                self._schedule_refresh(key, loader)
+                return entry.value
+
+        self.misses += 1
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._load(key, loader))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _t, k=key: self._inflight.pop(k, None))
+        try:
+            # shield: một client hủy yêu cầu không làm hủy lần tải mà các client khác đang chờ
+            return await asyncio.shield(task)
+        except UpstreamUnavailable:
+            if self.fallback_on_unavailable and entry is not None:
+                self.fallbacks += 1
+                return entry.value
+            raise
+
+    async def _load(self, key: Hashable, loader: Loader) -> Any:
+        generation = self._generation
+        value = await loader()
+        if generation == self._generation:
+            self.set(key, value)
+        return value
+
+    def _schedule_refresh(self, key: Hashable, loader: Loader) -> None:
+        if key in self._refreshing or key in self._inflight:
+            return
+        task = asyncio.ensure_future(self._refresh(key, loader))
+        self._refreshing[key] = task
+        task.add_done_callback(lambda _t, k=key: self._refreshing.pop(k, None))
+
+    async def _refresh(self, key: Hashable, loader: Loader) -> None:
+        self.refreshes += 1
+        try:
+            await self._load(key, loader)
+        except Exception as e:
+            # Giữ lại dữ liệu cũ, lần truy cập sau sẽ thử làm mới lại
+            self.refresh_errors += 1
+            log.warning("cache_refresh_error", cache=self.name, key=repr(key), error=str(e))
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "name": self.name,
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "stale_ttl": self.stale_ttl,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "refreshes": self.refreshes,
+            "refresh_errors": self.refresh_errors,
+            "evictions": self.evictions,
+            "fallbacks": self.fallbacks,
+            "hit_rate": round((self.hits + self.stale_hits) / lookups, 4) if lookups else None,
+        }
+
+
+# Cache cho dữ liệu danh mục phòng từ WordPress (accommodation types, accommodations)
+catalog_cache = TTLCache(
+    "catalog",
+    ttl=CATALOG_CACHE_TTL,
+    stale_ttl=CATALOG_CACHE_STALE_TTL,
+    maxsize=CATALOG_CACHE_MAXSIZE,
+    fallback_on_unavailable=True,
+)
+
+# Cache cho từng loại phòng (theo ID), dùng chung giữa các request khi xử lý danh sách phòng
+accommodation_type_cache = TTLCache(
+    "accommodation_type",
+    ttl=CATALOG_CACHE_TTL,
+    stale_ttl=CATALOG_CACHE_STALE_TTL,
+    maxsize=CATALOG_CACHE_MAXSIZE,
+    fallback_on_unavailable=True,
+)
+
+# Cache ngắn hạn cho kết quả kiểm tra phòng trống (không phục vụ dữ liệu cũ)
+availability_cache = TTLCache(
+    "availability",
+    ttl=AVAILABILITY_CACHE_TTL,
+    maxsize=1024,
+)
+
+# Cache ngắn hạn cho kết quả đổi token Zalo -> số điện thoại (key là hash của token, không lưu token gốc)
+zalo_phone_cache = TTLCache(
+    "zalo_phone",
+    ttl=ZALO_PHONE_CACHE_TTL,
+    maxsize=ZALO_PHONE_CACHE_MAXSIZE,
+)
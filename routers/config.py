@@ -16,4 +16,140 @@ ROOM_TYPES_MAP = {
     "Double Room": 1006,
     "Standard Room": 986,
     "Deluxe room": 3632
-}
\ No newline at end of file
+}
+
+# Cấu hình HTTP client dùng chung cho các lời gọi tới WordPress
+WP_HTTP_MAX_CONNECTIONS = int(os.getenv("WP_HTTP_MAX_CONNECTIONS", "50"))
+WP_HTTP_MAX_KEEPALIVE = int(os.getenv("WP_HTTP_MAX_KEEPALIVE", "20"))
+WP_HTTP_KEEPALIVE_EXPIRY = float(os.getenv("WP_HTTP_KEEPALIVE_EXPIRY", "30"))
+WP_HTTP2 = os.getenv("WP_HTTP2", "1") == "1"
+
+# Timeout (giây) cho từng loại endpoint upstream
+WP_TIMEOUT_DEFAULT = float(os.getenv("WP_TIMEOUT_DEFAULT", "20"))
+WP_TIMEOUTS = {
+    "create_booking": float(os.getenv("WP_TIMEOUT_CREATE_BOOKING", "20")),
+    "bookings": float(os.getenv("WP_TIMEOUT_BOOKINGS", "15")),
+    "accommodation_types": float(os.getenv("WP_TIMEOUT_ACCOMMODATION_TYPES", "10")),
+    "accommodation_type": float(os.getenv("WP_TIMEOUT_ACCOMMODATION_TYPE", "10")),
+    "availability": float(os.getenv("WP_TIMEOUT_AVAILABILITY", "10")),
+    "accommodations": float(os.getenv("WP_TIMEOUT_ACCOMMODATIONS", "20")),
+}
+
+# Timeout thích ứng: sau khi có đủ mẫu, timeout = p99 độ trễ gần đây * hệ số,
+# giới hạn trong [WP_TIMEOUT_MIN, timeout cấu hình ở trên]
+WP_ADAPTIVE_TIMEOUT = os.getenv("WP_ADAPTIVE_TIMEOUT", "1") == "1"
+WP_ADAPTIVE_TIMEOUT_MULTIPLIER = float(os.getenv("WP_ADAPTIVE_TIMEOUT_MULTIPLIER", "3"))
+WP_ADAPTIVE_MIN_SAMPLES = int(os.getenv("WP_ADAPTIVE_MIN_SAMPLES", "20"))
+WP_TIMEOUT_MIN = float(os.getenv("WP_TIMEOUT_MIN", "2"))
+WP_LATENCY_WINDOW = int(os.getenv("WP_LATENCY_WINDOW", "200"))
+
+# Circuit breaker theo endpoint: mở sau N lỗi liên tiếp (lỗi kết nối, timeout, 5xx),
+# thử lại một request sau WP_BREAKER_RESET giây
+WP_BREAKER_FAILURES = int(os.getenv("WP_BREAKER_FAILURES", "5"))
+WP_BREAKER_RESET = float(os.getenv("WP_BREAKER_RESET", "30"))
+
+# Hedged request cho các GET idempotent: gửi thêm một request nếu request đầu chưa xong
+# sau p95 độ trễ (hoặc WP_HEDGE_DELAY_MS khi chưa đủ mẫu). Để trống để tắt.
+WP_HEDGE_ROUTES = {r.strip() for r in os.getenv("WP_HEDGE_ROUTES", "").split(",") if r.strip()}
+WP_HEDGE_DELAY_MS = float(os.getenv("WP_HEDGE_DELAY_MS", "500"))
+
+# Kiểm soát tải (admission control):
+# - các route proxy (ADMISSION_PROXY_PREFIXES) bị giới hạn theo client bằng token bucket
+#   (ADMISSION_CLIENT_RATE request/giây, tối đa ADMISSION_CLIENT_BURST liên tiếp; 0 để tắt) -> 429;
+# - tối đa ADMISSION_PROXY_CONCURRENCY request proxy được xử lý cùng lúc; phần dư chờ trong hàng đợi
+#   (tối đa ADMISSION_QUEUE_SIZE, mỗi request chờ tối đa ADMISSION_QUEUE_TIMEOUT giây) rồi bị từ chối -> 503;
+# - tối đa ADMISSION_UPSTREAM_CONCURRENCY lời gọi WordPress/Zalo cùng lúc; lời gọi dư chỉ chờ lượt,
+#   không bị từ chối, vì request chứa nó đã được nhận;
+# - các route còn lại (/services/, /utilities/, /...) không đi qua hàng đợi nên vẫn phản hồi khi quá tải.
+# Client được nhận diện bằng IP kết nối; chỉ bật ADMISSION_TRUST_FORWARDED=1 khi app chạy sau
+# một proxy tin cậy ghi IP client vào cuối X-Forwarded-For (ví dụ Vercel), khi đó dùng IP cuối cùng.
+ADMISSION = os.getenv("ADMISSION", "1") == "1"
+ADMISSION_PROXY_PREFIXES = tuple(
+    p.strip() for p in os.getenv(
+        "ADMISSION_PROXY_PREFIXES", "/api/bookings,/api/accommodations,/api/get-phone-number,/home"
+    ).split(",") if p.strip()
+)
+ADMISSION_TRUST_FORWARDED = os.getenv("ADMISSION_TRUST_FORWARDED", "0") == "1"
+# Sau reverse proxy mà không tin X-Forwarded-For thì mọi người dùng có chung IP kết nối (của proxy),
+# nên giới hạn theo client mặc định chỉ bật khi ADMISSION_TRUST_FORWARDED=1
+ADMISSION_CLIENT_RATE = float(os.getenv("ADMISSION_CLIENT_RATE", "10" if ADMISSION_TRUST_FORWARDED else "0"))
+ADMISSION_CLIENT_BURST = int(os.getenv("ADMISSION_CLIENT_BURST", "20"))
+ADMISSION_CLIENT_MAXSIZE = int(os.getenv("ADMISSION_CLIENT_MAXSIZE", "10000"))
+ADMISSION_PROXY_CONCURRENCY = int(os.getenv("ADMISSION_PROXY_CONCURRENCY", "64"))
+ADMISSION_UPSTREAM_CONCURRENCY = int(os.getenv("ADMISSION_UPSTREAM_CONCURRENCY", "32"))
+ADMISSION_QUEUE_SIZE = int(os.getenv("ADMISSION_QUEUE_SIZE", "100"))
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "2"))
+
+# GET có điều kiện: lưu ETag/Last-Modified cùng kết quả đã xử lý của danh sách phòng và loại phòng,
+# khi làm mới gửi If-None-Match/If-Modified-Since và dùng lại kết quả nếu WordPress trả về 304
+WP_REVALIDATE = os.getenv("WP_REVALIDATE", "1") == "1"
+WP_REVALIDATE_MAXSIZE = int(os.getenv("WP_REVALIDATE_MAXSIZE", "256"))
+
+# Cache cho dữ liệu danh mục từ WordPress (giây / số mục)
+CATALOG_CACHE_TTL = float(os.getenv("CATALOG_CACHE_TTL", "300"))
+CATALOG_CACHE_STALE_TTL = float(os.getenv("CATALOG_CACHE_STALE_TTL", "86400"))
+CATALOG_CACHE_MAXSIZE = int(os.getenv("CATALOG_CACHE_MAXSIZE", "128"))
+
+# Token cho các endpoint quản trị (gửi qua header X-Admin-Token); để trống sẽ khóa các endpoint này
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+# Số trang WordPress được tải song song tối đa và giới hạn số trang khi lấy tất cả
+WP_PAGE_FANOUT = int(os.getenv("WP_PAGE_FANOUT", "4"))
+WP_MAX_PAGES = int(os.getenv("WP_MAX_PAGES", "50"))
+
+# Kiểm tra phòng trống: số lời gọi đồng thời tới WordPress, thời gian cache (giây)
+# và số cặp loại phòng/khoảng ngày tối đa trong một request batch
+WP_AVAILABILITY_CONCURRENCY = int(os.getenv("WP_AVAILABILITY_CONCURRENCY", "8"))
+AVAILABILITY_CACHE_TTL = float(os.getenv("AVAILABILITY_CACHE_TTL", "15"))
+AVAILABILITY_BATCH_MAX = int(os.getenv("AVAILABILITY_BATCH_MAX", "100"))
+
+# Bản sao inventory cục bộ:
+# - "remote": luôn hỏi WordPress (mặc định)
+# - "local": đồng bộ bản sao (dùng cho /availability/local và batch "local": true),
+#   từ chối sớm các đơn trùng lịch theo bản sao
+# - "local_confirm": như "local", nhưng khi đặt phòng luôn để WordPress xác nhận
+# /availability/ luôn trả về kết quả (kèm giá) của WordPress ở mọi chế độ.
+INVENTORY_MODE = os.getenv("INVENTORY_MODE", "remote")
+INVENTORY_SYNC_INTERVAL = float(os.getenv("INVENTORY_SYNC_INTERVAL", "60"))
+
+# Outbox đặt phòng (request có header Idempotency-Key): bật/tắt, chu kỳ quét (giây), thời hạn thử lại
+# tính từ lúc nhận đơn (giây), backoff (giây) giữa các lần thử, thời gian giữ một đơn đang gửi và số đơn
+# xử lý mỗi vòng. Đơn gửi tới WordPress được gắn key trong meta_data (OUTBOX_META_KEY) để tìm lại khi
+# không biết lần gửi trước có thành công không. Khi tắt, header Idempotency-Key bị bỏ qua và đơn được
+# gửi đồng bộ như trước.
+BOOKING_OUTBOX = os.getenv("BOOKING_OUTBOX", "1") == "1"
+OUTBOX_POLL_INTERVAL = float(os.getenv("OUTBOX_POLL_INTERVAL", "2"))
+OUTBOX_DEADLINE = float(os.getenv("OUTBOX_DEADLINE", "21600"))
+OUTBOX_META_KEY = os.getenv("OUTBOX_META_KEY", "_zalo_idempotency_key")
+OUTBOX_BACKOFF_BASE = float(os.getenv("OUTBOX_BACKOFF_BASE", "2"))
+OUTBOX_BACKOFF_MAX = float(os.getenv("OUTBOX_BACKOFF_MAX", "300"))
+OUTBOX_LEASE = float(os.getenv("OUTBOX_LEASE", "60"))
+OUTBOX_BATCH = int(os.getenv("OUTBOX_BATCH", "10"))
+
+# Nén response (gzip, hoặc brotli nếu đã cài gói 'brotli'): bật/tắt, kích thước tối thiểu (byte)
+# để nén, mức nén gzip (1-9) và quality của brotli (0-11)
+COMPRESSION = os.getenv("COMPRESSION", "1") == "1"
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+
+# Thời gian tối đa (giây) giữ một response danh mục đã mã hóa sẵn trước khi dựng lại từ database
+SNAPSHOT_MAX_AGE = float(os.getenv("SNAPSHOT_MAX_AGE", "300"))
+
+# Zalo Graph API: endpoint đổi token -> số điện thoại, timeout (giây)
+# và cache ngắn hạn cho kết quả thành công (mini-app thường gửi lại cùng một token)
+ZALO_GRAPH_URL = os.getenv("ZALO_GRAPH_URL", "https://graph.zalo.me/v2.0/me/info")
+ZALO_TIMEOUT = float(os.getenv("ZALO_TIMEOUT", "10"))
+ZALO_PHONE_CACHE_TTL = float(os.getenv("ZALO_PHONE_CACHE_TTL", "60"))
+ZALO_PHONE_CACHE_MAXSIZE = int(os.getenv("ZALO_PHONE_CACHE_MAXSIZE", "1024"))
+
+# Logging có cấu trúc: mức log, độ dài tối đa của một trường (ký tự),
+# tỷ lệ lấy mẫu log DEBUG/INFO mặc định và theo route (ví dụ "availability=0.1,accommodations=0.5")
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_MAX_FIELD_LENGTH = int(os.getenv("LOG_MAX_FIELD_LENGTH", "500"))
+LOG_SAMPLE_DEFAULT = float(os.getenv("LOG_SAMPLE_DEFAULT", "1.0"))
+LOG_SAMPLE_RATES = {
+    route.strip(): float(rate)
+    for route, _, rate in (item.partition("=") for item in os.getenv("LOG_SAMPLE_RATES", "").split(","))
+    if route.strip() and rate
+}
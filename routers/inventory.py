@@ -0,0 +1,415 @@
+# routers/inventory.py
+import asyncio
+import time
+from bisect import bisect_left
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import Column, Date, DateTime, Integer, String
+
+from database import Base, SessionLocal
+from .config import INVENTORY_MODE, INVENTORY_SYNC_INTERVAL
+from .upstream import wp_get
+from .logger import get_logger
+
+log = get_logger("inventory")
+
+# Các trạng thái đặt phòng không còn giữ phòng
+INACTIVE_BOOKING_STATUSES = {"cancelled", "abandoned", "trash"}
+
+
+# --- MODELS (Bản sao cục bộ của dữ liệu WordPress MPHB) ---
+class InventoryAccommodation(Base):
+    __tablename__ = "inventory_accommodation"
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    accommodation_type_id = Column(Integer, index=True)
+    title = Column(String(255))
+    status = Column(String(50))
+    modified = Column(String(50))
+
+class InventoryAccommodationType(Base):
+    __tablename__ = "inventory_accommodation_type"
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    title = Column(String(255))
+    adults = Column(Integer)
+    children = Column(Integer)
+    modified = Column(String(50))
+
+class InventoryBooking(Base):
+    __tablename__ = "inventory_booking"
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    status = Column(String(50), index=True)
+    check_in_date = Column(Date)
+    check_out_date = Column(Date)
+    modified = Column(String(50))
+
+class InventoryReservation(Base):
+    __tablename__ = "inventory_reservation"
+    id = Column(Integer, primary_key=True, index=True)
+    booking_id = Column(Integer, index=True)
+    accommodation_id = Column(Integer, index=True)
+    accommodation_type_id = Column(Integer, index=True)
+    check_in_date = Column(Date)
+    check_out_date = Column(Date)
+
+class InventorySyncCursor(Base):
+    __tablename__ = "inventory_sync_cursor"
+    resource = Column(String(64), primary_key=True)
+    cursor = Column(String(50))
+    updated_at = Column(DateTime)
+
+
+# --- INTERVAL INDEX (Tra cứu phòng trống trong bộ nhớ) ---
+class IntervalIndex:
+    """
+    Với mỗi phòng, lưu các khoảng ngày đã đặt [check_in, check_out) đã được gộp
+    và sắp xếp, nên việc kiểm tra một khoảng ngày chỉ cần một lần tìm nhị phân.
+    """
+
+    def __init__(self):
+        self._starts: Dict[int, List[date]] = {}
+        self._ends: Dict[int, List[date]] = {}
+        self._types: Dict[int, List[int]] = {}
+        self._capacities: Dict[int, Tuple[Optional[int], Optional[int]]] = {}
+
+    def set_accommodations(self, accommodations: List[Tuple[int, int]]) -> None:
+        types: Dict[int, List[int]] = {}
+        for accommodation_id, accommodation_type_id in accommodations:
+            types.setdefault(accommodation_type_id, []).append(accommodation_id)
+        self._types = types
+
+    def set_capacities(self, capacities: List[Tuple[int, Optional[int], Optional[int]]]) -> None:
+        self._capacities = {type_id: (adults, children) for type_id, adults, children in capacities}
+
+    def fits(self, accommodation_type_id: int, adults: int, children: int) -> bool:
+        """
+        Loại phòng có đủ chỗ cho số khách không (sức chứa chưa biết thì coi như đủ).
+        """
+        max_adults, max_children = self._capacities.get(accommodation_type_id, (None, None))
+        return (max_adults is None or adults <= max_adults) and (max_children is None or children <= max_children)
+
+    def set_reservations(self, accommodation_id: int, intervals: List[Tuple[date, date]]) -> None:
+        merged: List[List[date]] = []
+        for start, end in sorted(intervals):
+            if merged and start <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([start, end])
+        self._starts[accommodation_id] = [m[0] for m in merged]
+        self._ends[accommodation_id] = [m[1] for m in merged]
+
+    def add_reservation(self, accommodation_id: int, start: date, end: date) -> None:
+        intervals = list(zip(self._starts.get(accommodation_id, []), self._ends.get(accommodation_id, [])))
+        intervals.append((start, end))
+        self.set_reservations(accommodation_id, intervals)
+
+    def is_free(self, accommodation_id: int, start: date, end: date) -> bool:
+        starts = self._starts.get(accommodation_id)
+        if not starts:
+            return True
+        # Khoảng cuối cùng bắt đầu trước ngày trả phòng là khoảng duy nhất có thể giao nhau
+        idx = bisect_left(starts, end) - 1
+        return idx < 0 or self._ends[accommodation_id][idx] <= start
+
+    def free_accommodations(self, accommodation_type_id: int, start: date, end: date) -> List[int]:
+        return [
+            accommodation_id
+            for accommodation_id in self._types.get(accommodation_type_id, [])
+            if self.is_free(accommodation_id, start, end)
+        ]
+
+
+_index = IntervalIndex()
+_last_synced_at: Optional[float] = None
+_sync_task: Optional[asyncio.Task] = None
+
+
+def is_enabled() -> bool:
+    return INVENTORY_MODE in ("local", "local_confirm")
+
+
+def is_ready() -> bool:
+    """
+    Bản sao cục bộ chỉ được dùng sau khi đã đồng bộ thành công ít nhất một lần.
+    """
+    return is_enabled() and _last_synced_at is not None
+
+
+def _parse_date(value: Any) -> Optional[date]:
+    try:
+        return date.fromisoformat(str(value)[:10])
+    except (TypeError, ValueError):
+        return None
+
+
+def _modified_of(item: Dict[str, Any]) -> Optional[str]:
+    return item.get("date_modified_gmt") or item.get("date_modified") or item.get("modified")
+
+
+# --- ĐỒNG BỘ (Chạy trong threadpool vì SQLAlchemy ở đây là đồng bộ) ---
+def _load_cursor(resource: str) -> Optional[str]:
+    db = SessionLocal()
+    try:
+        row = db.get(InventorySyncCursor, resource)
+        return row.cursor if row else None
+    finally:
+        db.close()
+
+
+def _save_cursor(db, resource: str, cursor: Optional[str]) -> None:
+    if cursor is None:
+        return
+    row = db.get(InventorySyncCursor, resource)
+    if row is None:
+        row = InventorySyncCursor(resource=resource)
+        db.add(row)
+    row.cursor = cursor
+    row.updated_at = datetime.utcnow()
+
+
+def _upsert_accommodations(items: List[Dict[str, Any]], cursor: Optional[str]) -> None:
+    db = SessionLocal()
+    try:
+        for item in items:
+            if not isinstance(item, dict) or item.get("id") is None:
+                continue
+            row = db.get(InventoryAccommodation, item["id"])
+            if row is None:
+                row = InventoryAccommodation(id=item["id"])
+                db.add(row)
+            row.accommodation_type_id = item.get("accommodation_type_id")
+            row.title = item.get("title", "")
+            row.status = item.get("status", "")
+            row.modified = _modified_of(item)
+        _save_cursor(db, "accommodations", cursor)
+        db.commit()
+    finally:
+        db.close()
+
+
+def _upsert_accommodation_types(items: List[Dict[str, Any]], cursor: Optional[str]) -> None:
+    db = SessionLocal()
+    try:
+        for item in items:
+            if not isinstance(item, dict) or item.get("id") is None:
+                continue
+            row = db.get(InventoryAccommodationType, item["id"])
+            if row is None:
+                row = InventoryAccommodationType(id=item["id"])
+                db.add(row)
+            row.title = item.get("title", "")
+            row.adults = item.get("adults")
+            row.children = item.get("children")
+            row.modified = _modified_of(item)
+        _save_cursor(db, "accommodation_types", cursor)
+        db.commit()
+    finally:
+        db.close()
+
+
+def _upsert_bookings(items: List[Dict[str, Any]], cursor: Optional[str]) -> None:
+    db = SessionLocal()
+    try:
+        for item in items:
+            if not isinstance(item, dict) or item.get("id") is None:
+                continue
+            booking_id = item["id"]
+            row = db.get(InventoryBooking, booking_id)
+            if row is None:
+                row = InventoryBooking(id=booking_id)
+                db.add(row)
+            row.status = item.get("status", "")
+            row.check_in_date = _parse_date(item.get("check_in_date"))
+            row.check_out_date = _parse_date(item.get("check_out_date"))
+            row.modified = _modified_of(item)
+
+            # Ghi lại toàn bộ các phòng của đơn đặt phòng này
+            db.query(InventoryReservation).filter(InventoryReservation.booking_id == booking_id).delete()
+            for ra in item.get("reserved_accommodations", []) or []:
+                if not isinstance(ra, dict):
+                    continue
+                db.add(InventoryReservation(
+                    booking_id=booking_id,
+                    accommodation_id=ra.get("accommodation"),
+                    accommodation_type_id=ra.get("accommodation_type"),
+                    check_in_date=row.check_in_date,
+                    check_out_date=row.check_out_date,
+                ))
+        _save_cursor(db, "bookings", cursor)
+        db.commit()
+    finally:
+        db.close()
+
+
+def _build_index() -> IntervalIndex:
+    index = IntervalIndex()
+    db = SessionLocal()
+    try:
+        accommodations = db.query(InventoryAccommodation.id, InventoryAccommodation.accommodation_type_id).filter(
+            InventoryAccommodation.status == "publish"
+        ).all()
+        index.set_accommodations([(a.id, a.accommodation_type_id) for a in accommodations])
+        capacities = db.query(
+            InventoryAccommodationType.id, InventoryAccommodationType.adults, InventoryAccommodationType.children
+        ).all()
+        index.set_capacities([(t.id, t.adults, t.children) for t in capacities])
+
+        rows = db.query(
+            InventoryReservation.accommodation_id,
+            InventoryReservation.check_in_date,
+            InventoryReservation.check_out_date,
+        ).join(InventoryBooking, InventoryBooking.id == InventoryReservation.booking_id).filter(
+            InventoryBooking.status.notin_(INACTIVE_BOOKING_STATUSES)
+        ).all()
+        intervals: Dict[int, List[Tuple[date, date]]] = {}
+        for accommodation_id, start, end in rows:
+            if accommodation_id is not None and start and end:
+                intervals.setdefault(accommodation_id, []).append((start, end))
+        for accommodation_id, items in intervals.items():
+            index.set_reservations(accommodation_id, items)
+    finally:
+        db.close()
+    return index
+
+
+async def _sync_resource(resource: str, path: str, route: str, upsert) -> int:
+    """
+    Kéo các bản ghi đã thay đổi kể từ cursor lần trước (modified_after), theo từng trang,
+    rồi lưu vào database cục bộ. Trả về số bản ghi đã đồng bộ.
+    """
+    cursor = await asyncio.to_thread(_load_cursor, resource)
+    page, total_pages, count = 1, 1, 0
+    new_cursor = cursor
+    while page <= total_pages:
+        params: Dict[str, Any] = {"page": page, "per_page": 100, "orderby": "modified", "order": "asc"}
+        if cursor:
+            params["modified_after"] = cursor
+        response = await wp_get(path, route=route, params=params)
+        if response.status_code != 200:
+            raise RuntimeError(f"Lỗi WP API {response.status_code} khi đồng bộ {resource}: {response.text}")
+
+        items = response.json()
+        if isinstance(items, dict):
+            items = [items]
+        modified = [m for m in (_modified_of(i) for i in items if isinstance(i, dict)) if m]
+        if modified:
+            new_cursor = max([new_cursor, *modified] if new_cursor else modified)
+
+        # Cursor chỉ được lưu sau trang cuối để một lần đồng bộ lỗi giữa chừng sẽ được chạy lại từ đầu
+        try:
+            total_pages = int(response.headers.get("X-WP-TotalPages", "1"))
+        except ValueError:
+            total_pages = 1
+        await asyncio.to_thread(upsert, items, new_cursor if page >= total_pages else cursor)
+        count += len(items)
+        page += 1
+    return count
+
+
+async def sync_once() -> Dict[str, int]:
+    """
+    Đồng bộ tăng dần các loại phòng (sức chứa), phòng nghỉ và đơn đặt phòng, rồi dựng lại interval index.
+    """
+    global _index, _last_synced_at
+    accommodation_types = await _sync_resource(
+        "accommodation_types", "/accommodation_types", "accommodation_types", _upsert_accommodation_types
+    )
+    accommodations = await _sync_resource("accommodations", "/accommodations", "accommodations", _upsert_accommodations)
+    bookings = await _sync_resource("bookings", "/bookings", "bookings", _upsert_bookings)
+    _index = await asyncio.to_thread(_build_index)
+    _last_synced_at = time.time()
+    return {"accommodation_types": accommodation_types, "accommodations": accommodations, "bookings": bookings}
+
+
+async def _sync_loop() -> None:
+    while True:
+        try:
+            result = await sync_once()
+            log.info("inventory_synced", **result)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            log.error("inventory_sync_error", error=str(e))
+        await asyncio.sleep(INVENTORY_SYNC_INTERVAL)
+
+
+def start_sync_worker() -> None:
+    global _sync_task
+    if is_enabled() and _sync_task is None:
+        _sync_task = asyncio.ensure_future(_sync_loop())
+
+
+async def stop_sync_worker() -> None:
+    global _sync_task
+    if _sync_task is not None:
+        _sync_task.cancel()
+        try:
+            await _sync_task
+        except asyncio.CancelledError:
+            pass
+        _sync_task = None
+
+
+# --- TRA CỨU ---
+def local_availability(
+    accommodation_type: int,
+    check_in_date: str,
+    check_out_date: str,
+    adults: int = 1,
+    children: Optional[int] = 0,
+) -> Dict[str, Any]:
+    """
+    Tính phòng trống từ bản sao cục bộ (không gọi WordPress). Loại phòng không đủ sức chứa
+    cho số người lớn/trẻ em được coi là không còn phòng. Không có giá như kết quả của WordPress.
+    """
+    start, end = _parse_date(check_in_date), _parse_date(check_out_date)
+    if start is None or end is None or start >= end:
+        raise ValueError("Ngày nhận/trả phòng không hợp lệ (YYYY-MM-DD, nhận phòng trước trả phòng).")
+
+    children = children or 0
+    free: List[int] = []
+    if _index.fits(accommodation_type, adults, children):
+        free = _index.free_accommodations(accommodation_type, start, end)
+    return {
+        "source": "local",
+        "accommodation_type": accommodation_type,
+        "check_in_date": check_in_date,
+        "check_out_date": check_out_date,
+        "adults": adults,
+        "children": children,
+        "available": bool(free),
+        "available_count": len(free),
+        "accommodations": free,
+        "synced_at": _last_synced_at,
+    }
+
+
+def find_conflicts(reserved_accommodations: List[Dict[str, Any]], check_in_date: str, check_out_date: str) -> List[int]:
+    """
+    Trả về các phòng (accommodation) trong đơn đặt phòng đã bị đặt trong khoảng ngày này.
+    """
+    start, end = _parse_date(check_in_date), _parse_date(check_out_date)
+    if start is None or end is None:
+        return []
+    return [
+        ra["accommodation"]
+        for ra in reserved_accommodations
+        if ra.get("accommodation") is not None and not _index.is_free(ra["accommodation"], start, end)
+    ]
+
+
+async def record_booking(booking: Dict[str, Any]) -> None:
+    """
+    Ghi ngay một đơn vừa tạo vào bản sao cục bộ để không phải đợi lần đồng bộ tiếp theo.
+    """
+    if not is_ready() or not isinstance(booking, dict) or booking.get("id") is None:
+        return
+    start, end = _parse_date(booking.get("check_in_date")), _parse_date(booking.get("check_out_date"))
+    if start is None or end is None:
+        return
+    await asyncio.to_thread(_upsert_bookings, [booking], None)
+    if booking.get("status") in INACTIVE_BOOKING_STATUSES:
+        return
+    for ra in booking.get("reserved_accommodations", []) or []:
+        if isinstance(ra, dict) and ra.get("accommodation") is not None:
+            _index.add_reservation(ra["accommodation"], start, end)
@@ -0,0 +1,166 @@
+# routers/logger.py
+import json
+import logging
+import queue
+import random
+import re
+import sys
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Optional
+
+from .config import LOG_LEVEL, LOG_MAX_FIELD_LENGTH, LOG_SAMPLE_DEFAULT, LOG_SAMPLE_RATES
+
+# Các khóa luôn bị che giá trị khi ghi log
+REDACTED_KEYS = {
+    "secret_key",
+    "access_token",
+    "token",
+    "consumer_key",
+    "consumer_secret",
+    "wp_consumer_key",
+    "wp_consumer_secret",
+    "authorization",
+    "x-admin-token",
+    "phone_number",
+    "number",
+    "email",
+}
+
+# Khóa WooCommerce/MPHB (ck_..., cs_...) và số điện thoại Việt Nam xuất hiện trong chuỗi tự do
+_SECRET_PATTERN = re.compile(r"\b(ck|cs)_[0-9a-fA-F]{8,}\b")
+_PHONE_PATTERN = re.compile(r"(?<!\d)(?:\+?84|0)\d{8,10}(?!\d)")
+
+_listener: Optional[QueueListener] = None
+
+
+def _redact_string(value: str) -> str:
+    value = _SECRET_PATTERN.sub(lambda m: f"{m.group(1)}_***", value)
+    value = _PHONE_PATTERN.sub(lambda m: m.group(0)[:3] + "***" + m.group(0)[-2:], value)
+    if len(value) > LOG_MAX_FIELD_LENGTH:
+        value = f"{value[:LOG_MAX_FIELD_LENGTH]}...(+{len(value) - LOG_MAX_FIELD_LENGTH} ký tự)"
+    return value
+
+
+def sanitize(value: Any, depth: int = 0) -> Any:
+    """
+    Che các khóa bí mật / số điện thoại và cắt ngắn các chuỗi hoặc danh sách quá dài.
+    """
+    if depth > 5:
+        return "..."
+    if isinstance(value, dict):
+        return {
+            k: "***" if str(k).lower() in REDACTED_KEYS else sanitize(v, depth + 1)
+            for k, v in value.items()
+        }
+    if isinstance(value, (list, tuple)):
+        items = [sanitize(v, depth + 1) for v in value[:20]]
+        if len(value) > 20:
+            items.append(f"...(+{len(value) - 20} mục)")
+        return items
+    if isinstance(value, str):
+        return _redact_string(value)
+    if value is None or isinstance(value, (int, float, bool)):
+        return value
+    return _redact_string(str(value))
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Mỗi bản ghi log là một dòng JSON. Việc che và cắt dữ liệu chạy ở luồng ghi log,
+    không nằm trên đường xử lý request.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "event": record.getMessage(),
+        }
+        route = getattr(record, "route", None)
+        if route:
+            entry["route"] = route
+        fields = getattr(record, "fields", None)
+        if fields:
+            entry.update(sanitize(fields))
+        if record.exc_info:
+            entry["exc"] = _redact_string(self.formatException(record.exc_info))
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class _NonBlockingQueueHandler(QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Không format ở luồng gọi; chỉ sao chép nông các trường để tránh bị sửa sau khi log
+        fields = getattr(record, "fields", None)
+        if isinstance(fields, dict):
+            record.fields = dict(fields)
+        return record
+
+
+def setup_logging() -> None:
+    """
+    Cấu hình logger 'app': ghi vào hàng đợi trong bộ nhớ, một luồng nền ghi ra stdout.
+    """
+    global _listener
+    if _listener is not None:
+        return
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(JsonFormatter())
+
+    app_logger = logging.getLogger("app")
+    app_logger.setLevel(LOG_LEVEL)
+    app_logger.handlers = [_NonBlockingQueueHandler(log_queue)]
+    app_logger.propagate = False
+
+    _listener = QueueListener(log_queue, stream_handler, respect_handler_level=False)
+    _listener.start()
+
+
+def shutdown_logging() -> None:
+    """
+    Ghi hết các bản ghi còn trong hàng đợi rồi dừng luồng nền.
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def _sampled(route: str) -> bool:
+    rate = LOG_SAMPLE_RATES.get(route, LOG_SAMPLE_DEFAULT)
+    return rate >= 1 or random.random() < rate
+
+
+class EventLogger:
+    """
+    Logger có cấu trúc: log.info("event", route="...", key=value, ...).
+    Log DEBUG/INFO được lấy mẫu theo route (LOG_SAMPLE_RATES); WARNING trở lên luôn được ghi.
+    """
+
+    def __init__(self, name: str):
+        self._logger = logging.getLogger(f"app.{name}")
+
+    def _log(self, level: int, event: str, route: Optional[str], exc_info: bool, fields: Dict[str, Any]) -> None:
+        if not self._logger.isEnabledFor(level):
+            return
+        if level < logging.WARNING and route and not _sampled(route):
+            return
+        self._logger.log(level, event, exc_info=exc_info, extra={"fields": fields, "route": route})
+
+    def debug(self, event: str, route: Optional[str] = None, **fields: Any) -> None:
+        self._log(logging.DEBUG, event, route, False, fields)
+
+    def info(self, event: str, route: Optional[str] = None, **fields: Any) -> None:
+        self._log(logging.INFO, event, route, False, fields)
+
+    def warning(self, event: str, route: Optional[str] = None, **fields: Any) -> None:
+        self._log(logging.WARNING, event, route, False, fields)
+
+    def error(self, event: str, route: Optional[str] = None, exc_info: bool = False, **fields: Any) -> None:
+        self._log(logging.ERROR, event, route, exc_info, fields)
+
+
+def get_logger(name: str) -> EventLogger:
+    return EventLogger(name)
@@ -0,0 +1,207 @@
+# routers/metrics.py
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Định nghĩa router cho endpoint Prometheus
+router = APIRouter(tags=["metrics"])
+
+# Các mốc (giây) của histogram độ trễ
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0)
+
+# Các khoảng thời gian (bắt đầu, kết thúc) gọi upstream/DB/chờ hàng đợi của request hiện tại
+# (dùng cho header Server-Timing)
+_request_timings: ContextVar[Optional[Dict[str, List[Tuple[float, float]]]]] = ContextVar(
+    "request_timings", default=None
+)
+
+
+class Histogram:
+    """
+    Histogram theo nhãn, xuất ra định dạng text của Prometheus.
+    """
+
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...]):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        # nhãn -> [số đếm theo từng bucket..., tổng số, tổng thời gian]
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float, *labels: str) -> None:
+        idx = bisect_left(BUCKETS, seconds)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(BUCKETS) + 2)
+            if idx < len(BUCKETS):
+                series[idx] += 1
+            series[-2] += 1
+            series[-1] += seconds
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = [(labels, list(series)) for labels, series in self._series.items()]
+        for labels, series in sorted(items):
+            base = ",".join(f'{k}="{_escape(v)}"' for k, v in zip(self.label_names, labels))
+            sep = "," if base else ""
+            cumulative = 0
+            for bound, count in zip(BUCKETS, series):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{base}{sep}le="{bound}"}} {int(cumulative)}')
+            lines.append(f'{self.name}_bucket{{{base}{sep}le="+Inf"}} {int(series[-2])}')
+            lines.append(f"{self.name}_count{{{base}}} {int(series[-2])}")
+            lines.append(f"{self.name}_sum{{{base}}} {series[-1]:.6f}")
+        return lines
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+http_request_duration = Histogram(
+    "http_request_duration_seconds", "Thời gian xử lý request theo route.", ("method", "route", "status")
+)
+upstream_request_duration = Histogram(
+    "upstream_request_duration_seconds", "Thời gian gọi các dịch vụ upstream.", ("upstream", "endpoint", "status")
+)
+db_query_duration = Histogram(
+    "db_query_duration_seconds", "Thời gian thực thi câu lệnh SQL.", ("operation",)
+)
+admission_queue_wait = Histogram(
+    "admission_queue_wait_seconds", "Thời gian chờ trong hàng đợi kiểm soát tải.", ("gate", "result")
+)
+
+
+def _add_timing(kind: str, seconds: float) -> None:
+    # Được gọi ngay khi thao tác vừa kết thúc, nên khoảng thời gian là [bây giờ - seconds, bây giờ]
+    timings = _request_timings.get()
+    if timings is not None:
+        end = time.perf_counter()
+        timings.setdefault(kind, []).append((end - seconds, end))
+
+
+def _wall_time(intervals: List[Tuple[float, float]]) -> float:
+    """
+    Tổng thời gian thực của các khoảng (các lời gọi chạy song song chỉ được tính một lần).
+    """
+    total, current_start, current_end = 0.0, None, None
+    for start, end in sorted(intervals):
+        if current_end is None or start > current_end:
+            if current_end is not None:
+                total += current_end - current_start
+            current_start, current_end = start, end
+        else:
+            current_end = max(current_end, end)
+    if current_end is not None:
+        total += current_end - current_start
+    return total
+
+
+def observe_queue_wait(gate: str, result: str, seconds: float) -> None:
+    """
+    Ghi nhận thời gian một request chờ trong hàng đợi (result: admitted hoặc shed).
+    """
+    admission_queue_wait.observe(seconds, gate, result)
+    _add_timing("queue", seconds)
+
+
+def observe_upstream(upstream: str, endpoint: str, status: str, seconds: float) -> None:
+    """
+    Ghi nhận một lời gọi upstream (WordPress, Zalo Graph...).
+    """
+    upstream_request_duration.observe(seconds, upstream, endpoint, status)
+    _add_timing(upstream, seconds)
+
+
+# --- SQLAlchemy: đo thời gian từng câu lệnh SQL trên mọi engine ---
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_started"].pop()
+    seconds = time.perf_counter() - started
+    operation = statement.lstrip().split(" ", 1)[0].lower() if statement else "unknown"
+    db_query_duration.observe(seconds, operation)
+    _add_timing("db", seconds)
+
+
+def _route_template(scope) -> str:
+    """
+    Đường dẫn dạng template của route đã khớp (ví dụ /services/{service_id}), để số lượng nhãn
+    không tăng theo từng ID. Request không khớp route nào được gộp chung.
+    """
+    # Với router được include kèm prefix, scope["route"] là route gốc (thiếu prefix);
+    # FastAPI lưu route đã ghép prefix trong scope["fastapi"]["effective_route_context"]
+    effective = (scope.get("fastapi") or {}).get("effective_route_context")
+    path_format = getattr(effective, "path_format", None)
+    if path_format:
+        return path_format
+    path_format = getattr(scope.get("route"), "path_format", None)
+    if path_format:
+        return scope.get("root_path", "") + path_format
+    if scope.get("endpoint") is None or scope.get("path_params"):
+        return "unmatched"
+    return scope["path"]
+
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI: đo thời gian mỗi request theo route template và thêm header
+    Server-Timing với phần thời gian upstream, DB và xử lý nội bộ (app). Thời gian mỗi phần là
+    thời gian thực (các lời gọi song song không bị cộng dồn), nên không vượt quá total.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        timings: Dict[str, List[Tuple[float, float]]] = {}
+        token = _request_timings.set(timings)
+        status = {"code": 500}
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                total = time.perf_counter() - started
+                external = _wall_time([interval for intervals in timings.values() for interval in intervals])
+                parts = [f"{kind};dur={_wall_time(intervals) * 1000:.1f}" for kind, intervals in timings.items()]
+                parts.append(f"app;dur={max(total - external, 0) * 1000:.1f}")
+                parts.append(f"total;dur={total * 1000:.1f}")
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", ", ".join(parts).encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_timings.reset(token)
+            http_request_duration.observe(
+                time.perf_counter() - started, scope["method"], _route_template(scope), str(status["code"])
+            )
+
+
+@router.get("/metrics", summary="Metrics định dạng Prometheus", include_in_schema=False)
+def get_metrics():
+    lines: List[str] = []
+    for histogram in (http_request_duration, upstream_request_duration, db_query_duration, admission_queue_wait):
+        lines.extend(histogram.render())
+    return PlainTextResponse("\n".join(lines) + "\n", media_type="text/plain; version=0.0.4")
@@ -0,0 +1,412 @@
+# routers/outbox.py
+import asyncio
+import hashlib
+import json
+import random
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import Column, DateTime, Integer, String, Text, update
+from sqlalchemy.exc import IntegrityError
+
+from database import Base, SessionLocal
+from .config import (
+    BOOKING_OUTBOX,
+    OUTBOX_POLL_INTERVAL,
+    OUTBOX_DEADLINE,
+    OUTBOX_META_KEY,
+    OUTBOX_BACKOFF_BASE,
+    OUTBOX_BACKOFF_MAX,
+    OUTBOX_LEASE,
+    OUTBOX_BATCH,
+)
+from .upstream import wp_get, wp_post
+from .resilience import UpstreamUnavailable
+from . import inventory
+from .logger import get_logger
+
+log = get_logger("outbox")
+
+# pending: chờ gửi (hoặc chờ thử lại); sending: đang gửi; succeeded / failed: đã xong
+PENDING, SENDING, SUCCEEDED, FAILED = "pending", "sending", "succeeded", "failed"
+
+# Các mã lỗi WordPress nên thử lại (ngoài 5xx)
+RETRYABLE_STATUSES = {408, 425, 429}
+
+_worker_task: Optional[asyncio.Task] = None
+_wake = asyncio.Event()
+
+
+class IdempotencyConflict(Exception):
+    """
+    Idempotency-Key đã được dùng cho một đơn đặt phòng có nội dung khác.
+    """
+
+
+# --- MODEL ---
+class BookingOutbox(Base):
+    __tablename__ = "booking_outbox"
+    id = Column(Integer, primary_key=True, index=True)
+    idempotency_key = Column(String(255), unique=True, nullable=False)
+    payload_hash = Column(String(64))
+    payload = Column(Text)              # JSON gửi tới WordPress
+    status = Column(String(20), index=True)
+    attempts = Column(Integer, default=0)
+    next_attempt_at = Column(DateTime, index=True)
+    response_status = Column(Integer)
+    response = Column(Text)             # JSON WordPress trả về (đơn đã tạo hoặc lỗi)
+    last_error = Column(Text)
+    created_at = Column(DateTime)
+    updated_at = Column(DateTime)
+
+
+def _hash_payload(payload: Dict[str, Any]) -> str:
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def _to_dict(row: BookingOutbox) -> Dict[str, Any]:
+    result: Dict[str, Any] = {
+        "idempotency_key": row.idempotency_key,
+        "status": row.status,
+        "attempts": row.attempts,
+        "created_at": row.created_at.isoformat() if row.created_at else None,
+        "updated_at": row.updated_at.isoformat() if row.updated_at else None,
+    }
+    if row.status == SUCCEEDED:
+        result["booking"] = json.loads(row.response) if row.response else None
+    elif row.status == FAILED:
+        result["error"] = {
+            "status_code": row.response_status,
+            "detail": json.loads(row.response) if row.response else row.last_error,
+        }
+    elif row.last_error:
+        result["last_error"] = row.last_error
+    return result
+
+
+# --- TRUY CẬP DATABASE (đồng bộ, gọi qua asyncio.to_thread) ---
+def _get(idempotency_key: str) -> Optional[Dict[str, Any]]:
+    db = SessionLocal()
+    try:
+        row = db.query(BookingOutbox).filter(BookingOutbox.idempotency_key == idempotency_key).first()
+        return _to_dict(row) if row else None
+    finally:
+        db.close()
+
+
+def _insert(idempotency_key: str, payload: Dict[str, Any]) -> Tuple[Dict[str, Any], bool]:
+    payload_hash = _hash_payload(payload)
+    db = SessionLocal()
+    try:
+        existing = db.query(BookingOutbox).filter(BookingOutbox.idempotency_key == idempotency_key).first()
+        if existing is None:
+            now = datetime.utcnow()
+            row = BookingOutbox(
+                idempotency_key=idempotency_key,
+                payload_hash=payload_hash,
+                payload=json.dumps(payload, ensure_ascii=False),
+                status=PENDING,
+                attempts=0,
+                next_attempt_at=now,
+                created_at=now,
+                updated_at=now,
+            )
+            db.add(row)
+            try:
+                db.commit()
+                return _to_dict(row), True
+            except IntegrityError:
+                # Một request khác cùng key vừa ghi trước
+                db.rollback()
+                existing = db.query(BookingOutbox).filter(BookingOutbox.idempotency_key == idempotency_key).one()
+        if existing.payload_hash != payload_hash:
+            raise IdempotencyConflict(idempotency_key)
+        return _to_dict(existing), False
+    finally:
+        db.close()
+
+
+class _Claim:
+    __slots__ = ("row_id", "idempotency_key", "payload", "attempts", "created_at")
+
+    def __init__(self, row: BookingOutbox):
+        self.row_id = row.id
+        self.idempotency_key = row.idempotency_key
+        self.payload = json.loads(row.payload)
+        self.attempts = row.attempts
+        self.created_at = row.created_at
+
+
+def _claim_due(limit: int) -> List[_Claim]:
+    """
+    Nhận các đơn đến hạn gửi. Mỗi đơn được "giữ" OUTBOX_LEASE giây bằng một câu UPDATE có điều kiện,
+    nên nhiều tiến trình (nhiều worker uvicorn) không gửi trùng; đơn của tiến trình bị tắt giữa chừng
+    sẽ được nhận lại khi hết hạn giữ.
+    """
+    now = datetime.utcnow()
+    db = SessionLocal()
+    try:
+        candidates = db.query(BookingOutbox.id).filter(
+            BookingOutbox.status.in_((PENDING, SENDING)),
+            BookingOutbox.next_attempt_at <= now,
+        ).order_by(BookingOutbox.next_attempt_at).limit(limit).all()
+
+        claimed = []
+        for (row_id,) in candidates:
+            result = db.execute(
+                update(BookingOutbox)
+                .where(
+                    BookingOutbox.id == row_id,
+                    BookingOutbox.status.in_((PENDING, SENDING)),
+                    BookingOutbox.next_attempt_at <= now,
+                )
+                .values(
+                    status=SENDING,
+                    attempts=BookingOutbox.attempts + 1,
+                    next_attempt_at=now + timedelta(seconds=OUTBOX_LEASE),
+                    updated_at=now,
+                )
+            )
+            db.commit()
+            if result.rowcount == 1:
+                claimed.append(_Claim(db.get(BookingOutbox, row_id)))
+        return claimed
+    finally:
+        db.close()
+
+
+def _finish(row_id: int, status: str, response_status: Optional[int], response: Any, error: Optional[str],
+            retry_in: Optional[float] = None, count_attempt: bool = True) -> None:
+    now = datetime.utcnow()
+    db = SessionLocal()
+    try:
+        row = db.get(BookingOutbox, row_id)
+        if not count_attempt:
+            # Đơn chưa được gửi đi (circuit breaker mở, quá tải): không tính là một lần thử
+            row.attempts = max(0, row.attempts - 1)
+        row.status = status
+        row.response_status = response_status
+        row.response = json.dumps(response, ensure_ascii=False) if response is not None else None
+        row.last_error = error
+        row.next_attempt_at = now + timedelta(seconds=retry_in) if retry_in is not None else None
+        row.updated_at = now
+        db.commit()
+    finally:
+        db.close()
+
+
+def _backoff(attempts: int) -> float:
+    # Exponential backoff có jitter để các đơn lỗi cùng lúc không dồn lại một thời điểm
+    delay = min(OUTBOX_BACKOFF_MAX, OUTBOX_BACKOFF_BASE * (2 ** (attempts - 1)))
+    return delay * random.uniform(0.5, 1.0)
+
+
+# --- GỬI ĐƠN ---
+def _tagged(payload: Dict[str, Any], idempotency_key: str) -> Dict[str, Any]:
+    """
+    Gắn idempotency key vào đơn gửi tới WordPress (meta_data) để có thể tìm lại đơn đã tạo.
+    """
+    meta = [m for m in payload.get("meta_data", []) if isinstance(m, dict) and m.get("key") != OUTBOX_META_KEY]
+    return {**payload, "meta_data": [*meta, {"key": OUTBOX_META_KEY, "value": idempotency_key}]}
+
+
+def _accommodation_ids(booking: Dict[str, Any]) -> List[str]:
+    return sorted(
+        str(ra.get("accommodation"))
+        for ra in booking.get("reserved_accommodations", []) or []
+        if isinstance(ra, dict)
+    )
+
+
+def _created_at(booking: Dict[str, Any]) -> Optional[datetime]:
+    value = booking.get("date_created_gmt") or booking.get("date_created")
+    try:
+        return datetime.fromisoformat(str(value)[:19]) if value else None
+    except ValueError:
+        return None
+
+
+def _is_same_booking(booking: Dict[str, Any], claim: _Claim) -> bool:
+    """
+    Đơn trên WordPress có phải là đơn của outbox này không: theo key trong meta_data nếu WordPress
+    trả về meta_data, ngược lại so ngày, email khách và các phòng đã đặt, chỉ với đơn còn hiệu lực
+    được tạo từ lúc outbox nhận đơn (không nhận nhầm đơn cũ đã hủy của cùng khách).
+    """
+    meta = booking.get("meta_data")
+    if isinstance(meta, list):
+        for m in meta:
+            if isinstance(m, dict) and m.get("key") == OUTBOX_META_KEY:
+                return m.get("value") == claim.idempotency_key
+    if booking.get("status") in inventory.INACTIVE_BOOKING_STATUSES:
+        return False
+    created_at = _created_at(booking)
+    if created_at is None or claim.created_at is None or created_at < claim.created_at.replace(microsecond=0):
+        return False
+    payload = claim.payload
+    customer = booking.get("customer") if isinstance(booking.get("customer"), dict) else {}
+    return (
+        str(booking.get("check_in_date", ""))[:10] == payload.get("check_in_date")
+        and str(booking.get("check_out_date", ""))[:10] == payload.get("check_out_date")
+        and customer.get("email") == payload.get("customer", {}).get("email")
+        and _accommodation_ids(booking) == _accommodation_ids(payload)
+    )
+
+
+async def _find_delivered(claim: _Claim) -> Optional[Dict[str, Any]]:
+    """
+    Tìm trên WordPress đơn đã được tạo bởi một lần gửi trước (ví dụ timeout sau khi WordPress
+    đã nhận đơn), để không tạo đơn trùng khi gửi lại.
+    """
+    params: Dict[str, Any] = {"per_page": 100, "orderby": "modified", "order": "desc"}
+    if claim.created_at:
+        # Lùi một ngày để không bỏ sót do WordPress hiểu mốc thời gian theo múi giờ của site
+        params["modified_after"] = (claim.created_at - timedelta(days=1)).isoformat(timespec="seconds")
+    response = await wp_get("/bookings", route="bookings", params=params)
+    if response.status_code != 200:
+        raise RuntimeError(f"Lỗi WP API {response.status_code} khi tìm đơn đã gửi")
+    items = response.json()
+    for booking in items if isinstance(items, list) else [items]:
+        if isinstance(booking, dict) and _is_same_booking(booking, claim):
+            return booking
+    return None
+
+
+def _was_sent(error: Exception) -> bool:
+    """
+    False nếu lỗi xảy ra trước khi request được gửi đi (chưa kết nối được), True nếu request
+    có thể đã tới WordPress (ví dụ timeout khi chờ phản hồi).
+    """
+    import httpx
+
+    return not isinstance(error, (UpstreamUnavailable, httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout))
+
+
+def _expired(claim: _Claim) -> bool:
+    # Hết thời hạn OUTBOX_DEADLINE (tính từ lúc nhận đơn) thì không thử lại nữa
+    return claim.created_at is not None and datetime.utcnow() - claim.created_at >= timedelta(seconds=OUTBOX_DEADLINE)
+
+
+async def _succeeded(claim: _Claim, status_code: int, body: Any) -> None:
+    await asyncio.to_thread(_finish, claim.row_id, SUCCEEDED, status_code, body, None)
+    await inventory.record_booking(body)
+
+
+async def _deliver(claim: _Claim) -> None:
+    row_id, attempts = claim.row_id, claim.attempts
+    status_code, body, count_attempt = None, None, True
+    try:
+        # Lần gửi trước đã tới WordPress mà không có kết quả rõ ràng: tìm đơn trước khi gửi lại
+        existing = await _find_delivered(claim) if attempts > 1 else None
+        if existing is not None:
+            await _succeeded(claim, 200, existing)
+            log.info("outbox_recovered", route="create_booking", outbox_id=row_id, attempts=attempts,
+                     booking_id=existing.get("id"))
+            return
+        payload = _tagged(claim.payload, claim.idempotency_key)
+        response = await wp_post("/bookings", route="create_booking", json=payload)
+    except UpstreamUnavailable as e:
+        # Circuit breaker mở hoặc quá tải: đơn chưa được gửi, chờ theo Retry-After và không tính lần thử
+        error = str(e.detail)
+        retry_in = max(_backoff(1), float(e.headers.get("Retry-After", 1)))
+        if not _expired(claim):
+            await asyncio.to_thread(_finish, row_id, PENDING, None, None, error, retry_in, False)
+            log.info("outbox_deferred", route="create_booking", outbox_id=row_id, retry_in=round(retry_in, 1))
+            return
+    except Exception as e:
+        error = str(e) or type(e).__name__
+        # Chưa kết nối được tới WordPress thì không tính lần thử; mỗi lần thử được tính
+        # (attempts > 1) nghĩa là đơn có thể đã tới WordPress và cần tìm lại trước khi gửi
+        count_attempt = _was_sent(e)
+    else:
+        status_code, error = response.status_code, None
+        try:
+            body = response.json()
+        except ValueError:
+            body = {"message": response.text}
+
+        if status_code in (200, 201):
+            await _succeeded(claim, status_code, body)
+            log.info("outbox_delivered", route="create_booking", outbox_id=row_id, attempts=attempts)
+            return
+
+        if status_code < 500 and status_code not in RETRYABLE_STATUSES:
+            # WordPress từ chối đơn (dữ liệu sai, hết phòng...): không thử lại
+            await asyncio.to_thread(_finish, row_id, FAILED, status_code, body, None)
+            log.warning("outbox_rejected", route="create_booking", outbox_id=row_id, status=status_code, body=body)
+            return
+        error = f"WordPress trả về {status_code}"
+
+    if _expired(claim):
+        await asyncio.to_thread(_finish, row_id, FAILED, status_code, body, error)
+        log.error("outbox_gave_up", route="create_booking", outbox_id=row_id, attempts=attempts, error=error)
+        return
+
+    retry_in = _backoff(attempts)
+    await asyncio.to_thread(_finish, row_id, PENDING, status_code, None, error, retry_in, count_attempt)
+    log.warning("outbox_retry", route="create_booking", outbox_id=row_id, attempts=attempts,
+                retry_in=round(retry_in, 1), error=error)
+
+
+async def process_due() -> int:
+    """
+    Gửi các đơn đến hạn (song song trong một vòng). Trả về số đơn đã xử lý.
+    """
+    claimed = await asyncio.to_thread(_claim_due, OUTBOX_BATCH)
+    await asyncio.gather(*(_deliver(claim) for claim in claimed))
+    return len(claimed)
+
+
+async def _worker_loop() -> None:
+    while True:
+        try:
+            processed = await process_due()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            log.error("outbox_worker_error", error=str(e))
+            processed = 0
+        if processed >= OUTBOX_BATCH:
+            # Còn đơn đến hạn: xử lý vòng tiếp theo ngay
+            continue
+        _wake.clear()
+        try:
+            await asyncio.wait_for(_wake.wait(), timeout=OUTBOX_POLL_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+
+
+def is_enabled() -> bool:
+    return BOOKING_OUTBOX
+
+
+def start_worker() -> None:
+    global _worker_task
+    if is_enabled() and _worker_task is None:
+        _worker_task = asyncio.ensure_future(_worker_loop())
+
+
+async def stop_worker() -> None:
+    global _worker_task
+    if _worker_task is not None:
+        _worker_task.cancel()
+        try:
+            await _worker_task
+        except asyncio.CancelledError:
+            pass
+        _worker_task = None
+
+
+# --- API CHO ROUTER ---
+async def submit(idempotency_key: str, payload: Dict[str, Any]) -> Tuple[Dict[str, Any], bool]:
+    """
+    Ghi đơn vào outbox và đánh thức worker. Trả về (trạng thái, có phải đơn mới không).
+    Gửi lại cùng key và cùng nội dung trả về trạng thái của đơn ban đầu.
+    """
+    result, created = await asyncio.to_thread(_insert, idempotency_key, payload)
+    if created:
+        _wake.set()
+    return result, created
+
+
+async def get_status(idempotency_key: str) -> Optional[Dict[str, Any]]:
+    return await asyncio.to_thread(_get, idempotency_key)
@@ -0,0 +1,191 @@
+# routers/resilience.py
+import math
+import time
+from collections import deque
+from typing import Any, Deque, Dict
+
+from fastapi import HTTPException
+
+from .config import (
+    WP_TIMEOUT_DEFAULT,
+    WP_TIMEOUTS,
+    WP_ADAPTIVE_TIMEOUT,
+    WP_ADAPTIVE_TIMEOUT_MULTIPLIER,
+    WP_ADAPTIVE_MIN_SAMPLES,
+    WP_TIMEOUT_MIN,
+    WP_LATENCY_WINDOW,
+    WP_BREAKER_FAILURES,
+    WP_BREAKER_RESET,
+    WP_HEDGE_DELAY_MS,
+)
+from .logger import get_logger
+
+log = get_logger("resilience")
+
+# Trạng thái circuit breaker và độ trễ theo endpoint, dùng cho endpoint quản trị
+BREAKERS: Dict[str, "CircuitBreaker"] = {}
+LATENCIES: Dict[str, "LatencyTracker"] = {}
+
+
+class UpstreamUnavailable(HTTPException):
+    """
+    Circuit breaker đang mở: trả 503 ngay (kèm Retry-After) thay vì chờ WordPress timeout.
+    """
+
+    def __init__(self, route: str, retry_after: int,
+                 message: str = "WordPress tạm thời không phản hồi, vui lòng thử lại sau."):
+        super().__init__(
+            status_code=503,
+            detail={"message": message, "route": route},
+            headers={"Retry-After": str(retry_after)},
+        )
+        self.route = route
+
+
+class CircuitBreaker:
+    """
+    closed: cho qua mọi request;
+    open: từ chối ngay sau `failure_threshold` lỗi liên tiếp, trong `reset_timeout` giây;
+    half_open: cho một request thử, thành công thì đóng lại, lỗi thì mở tiếp.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = WP_BREAKER_FAILURES, reset_timeout: float = WP_BREAKER_RESET):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probe_started = 0.0
+        self.opened = 0
+        self.rejected = 0
+
+    def allow(self) -> bool:
+        if self.state == "closed":
+            return True
+        now = time.monotonic()
+        if self.state == "open":
+            if now - self.opened_at < self.reset_timeout:
+                return False
+            self.state = "half_open"
+            self._probe_started = now
+            return True
+        # half_open: request thử đang chạy; nếu nó bị treo (hoặc bị hủy) quá lâu thì cho thử lại
+        if now - self._probe_started >= self.reset_timeout:
+            self._probe_started = now
+            return True
+        return False
+
+    def check(self) -> None:
+        if not self.allow():
+            self.rejected += 1
+            raise UpstreamUnavailable(self.name, self.retry_after())
+
+    def retry_after(self) -> int:
+        remaining = self.opened_at + self.reset_timeout - time.monotonic()
+        return max(1, math.ceil(remaining))
+
+    def record_success(self) -> None:
+        if self.state != "closed":
+            log.warning("circuit_closed", route=self.name)
+        self.state = "closed"
+        self.failures = 0
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.state == "half_open" or (self.state == "closed" and self.failures >= self.failure_threshold):
+            self.state = "open"
+            self.opened_at = time.monotonic()
+            self.opened += 1
+            log.warning("circuit_opened", route=self.name, failures=self.failures)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "opened": self.opened,
+            "rejected": self.rejected,
+            "retry_after": self.retry_after() if self.state != "closed" else None,
+        }
+
+
+class LatencyTracker:
+    """
+    Lưu độ trễ của WP_LATENCY_WINDOW lời gọi gần nhất để tính percentile.
+    """
+
+    def __init__(self, window: int = WP_LATENCY_WINDOW):
+        self._samples: Deque[float] = deque(maxlen=window)
+        self.hedges = 0
+        self.hedge_wins = 0
+        # GET có điều kiện (xem upstream.wp_get_revalidated): số lần gửi validator / số lần nhận 304
+        self.revalidations = 0
+        self.not_modified = 0
+
+    def record(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, pct: float) -> float:
+        samples = sorted(self._samples)
+        if not samples:
+            return 0.0
+        return samples[min(len(samples) - 1, int(len(samples) * pct / 100))]
+
+
+def get_breaker(route: str) -> CircuitBreaker:
+    breaker = BREAKERS.get(route)
+    if breaker is None:
+        breaker = BREAKERS[route] = CircuitBreaker(route)
+    return breaker
+
+
+def get_latency(route: str) -> LatencyTracker:
+    tracker = LATENCIES.get(route)
+    if tracker is None:
+        tracker = LATENCIES[route] = LatencyTracker()
+    return tracker
+
+
+def timeout_for(route: str) -> float:
+    """
+    Timeout cho một lời gọi: giá trị cấu hình, hoặc p99 gần đây * hệ số khi đã đủ mẫu.
+    Timeout thích ứng không bao giờ lớn hơn giá trị cấu hình.
+    """
+    configured = WP_TIMEOUTS.get(route, WP_TIMEOUT_DEFAULT)
+    tracker = LATENCIES.get(route)
+    if not WP_ADAPTIVE_TIMEOUT or tracker is None or len(tracker) < WP_ADAPTIVE_MIN_SAMPLES:
+        return configured
+    adaptive = tracker.percentile(99) * WP_ADAPTIVE_TIMEOUT_MULTIPLIER
+    return min(configured, max(WP_TIMEOUT_MIN, adaptive))
+
+
+def hedge_delay(route: str) -> float:
+    """
+    Thời gian chờ trước khi gửi request dự phòng: p95 gần đây, hoặc WP_HEDGE_DELAY_MS khi chưa đủ mẫu.
+    """
+    tracker = LATENCIES.get(route)
+    if tracker is None or len(tracker) < WP_ADAPTIVE_MIN_SAMPLES:
+        return WP_HEDGE_DELAY_MS / 1000
+    return tracker.percentile(95)
+
+
+def stats() -> Dict[str, Any]:
+    routes = sorted(set(BREAKERS) | set(LATENCIES))
+    result = {}
+    for route in routes:
+        tracker = LATENCIES.get(route)
+        result[route] = {
+            "breaker": BREAKERS[route].stats() if route in BREAKERS else None,
+            "timeout": timeout_for(route),
+            "samples": len(tracker) if tracker else 0,
+            "p50_ms": round(tracker.percentile(50) * 1000, 1) if tracker else None,
+            "p99_ms": round(tracker.percentile(99) * 1000, 1) if tracker else None,
+            "hedges": tracker.hedges if tracker else 0,
+            "hedge_wins": tracker.hedge_wins if tracker else 0,
+            "revalidations": tracker.revalidations if tracker else 0,
+            "not_modified": tracker.not_modified if tracker else 0,
+        }
+    return result
@@ -0,0 +1,34 @@
+# routers/responses.py
+import json
+from typing import Any
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+# orjson là tùy chọn: nhanh hơn nhiều với payload lớn, nếu chưa cài thì dùng json chuẩn
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps(data: Any) -> bytes:
+    """
+    Mã hóa JSON giống JSONResponse của Starlette (UTF-8, không escape tiếng Việt, không khoảng trắng thừa).
+    Kiểu dữ liệu không phải JSON thuần (datetime, model...) được chuyển bằng jsonable_encoder.
+    """
+    if orjson is not None:
+        return orjson.dumps(data, default=jsonable_encoder, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(
+        data, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":"), default=jsonable_encoder
+    ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSONResponse dùng orjson (nếu có). Endpoint trả về trực tiếp FastJSONResponse(data) với dữ liệu
+    dict/list thuần (ví dụ JSON từ WordPress) sẽ bỏ qua bước jsonable_encoder của FastAPI.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,326 @@
+# routers/search.py
+import asyncio
+import bisect
+import re
+import threading
+import time
+import unicodedata
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Sequence, Set, Tuple
+
+from fastapi import APIRouter, HTTPException, Query
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from .logger import get_logger
+
+# Định nghĩa router cho endpoint tìm kiếm
+router = APIRouter(tags=["search"])
+log = get_logger("search")
+
+_TOKEN = re.compile(r"[^\W_]+")
+
+Key = Tuple[str, Hashable]
+
+
+def fold(text: str) -> str:
+    """
+    Bỏ dấu tiếng Việt và chuyển về chữ thường: "Phòng Đôi" -> "phong doi".
+    """
+    text = unicodedata.normalize("NFD", text.replace("đ", "d").replace("Đ", "D"))
+    return "".join(ch for ch in text if unicodedata.category(ch) != "Mn").lower()
+
+
+def tokenize(text: Any) -> List[str]:
+    return _TOKEN.findall(fold(str(text))) if text else []
+
+
+class _Doc:
+    __slots__ = ("record", "terms")
+
+    def __init__(self, record: Dict[str, Any], terms: Set[str]):
+        self.record = record
+        self.terms = terms
+
+
+class SearchIndex:
+    """
+    Chỉ mục đảo ngược trong bộ nhớ: từ (đã bỏ dấu) -> tập tài liệu (kind, id).
+    Danh sách từ được giữ đã sắp xếp để tìm theo tiền tố bằng bisect.
+    Các thay đổi (upsert/remove) chỉ cập nhật các từ của tài liệu bị thay đổi.
+    """
+
+    def __init__(self):
+        self._docs: Dict[Key, _Doc] = {}
+        self._postings: Dict[str, Set[Key]] = {}
+        self._terms: List[str] = []
+        # Ghi từ threadpool (commit của session đồng bộ) và đọc từ event loop
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def _unlink(self, key: Key, terms: Set[str]) -> None:
+        for term in terms:
+            keys = self._postings[term]
+            keys.discard(key)
+            if not keys:
+                del self._postings[term]
+                del self._terms[bisect.bisect_left(self._terms, term)]
+
+    def _link(self, key: Key, terms: Set[str]) -> None:
+        for term in terms:
+            keys = self._postings.get(term)
+            if keys is None:
+                keys = self._postings[term] = set()
+                bisect.insort(self._terms, term)
+            keys.add(key)
+
+    def _upsert(self, kind: str, record: Dict[str, Any], fields: Sequence[str]) -> bool:
+        key = (kind, record["id"])
+        terms = {term for name in fields for term in tokenize(record.get(name))}
+        doc = self._docs.get(key)
+        if doc is not None and doc.terms == terms:
+            doc.record = record
+            return False
+        if doc is not None:
+            self._unlink(key, doc.terms)
+        self._link(key, terms)
+        self._docs[key] = _Doc(record, terms)
+        return True
+
+    def _remove(self, key: Key) -> bool:
+        doc = self._docs.pop(key, None)
+        if doc is None:
+            return False
+        self._unlink(key, doc.terms)
+        return True
+
+    def upsert(self, kind: str, record: Dict[str, Any], fields: Sequence[str]) -> bool:
+        with self._lock:
+            return self._upsert(kind, record, fields)
+
+    def remove(self, kind: str, doc_id: Hashable) -> bool:
+        with self._lock:
+            return self._remove((kind, doc_id))
+
+    def replace(self, kind: str, records: List[Dict[str, Any]], fields: Sequence[str]) -> Dict[str, int]:
+        """
+        Thay toàn bộ tài liệu của một loại; chỉ tài liệu mới/đã đổi/đã xóa được đánh chỉ mục lại.
+        """
+        with self._lock:
+            ids = {record["id"] for record in records}
+            removed = [key for key in self._docs if key[0] == kind and key[1] not in ids]
+            for key in removed:
+                self._remove(key)
+            changed = sum(self._upsert(kind, record, fields) for record in records)
+        return {"changed": changed, "removed": len(removed)}
+
+    def _matches(self, token: str) -> Dict[Key, int]:
+        """
+        Tài liệu chứa từ bắt đầu bằng token: 2 điểm nếu trùng cả từ, 1 điểm nếu chỉ trùng tiền tố.
+        """
+        scores: Dict[Key, int] = {}
+        start = bisect.bisect_left(self._terms, token)
+        for term in self._terms[start:]:
+            if not term.startswith(token):
+                break
+            score = 2 if term == token else 1
+            for key in self._postings[term]:
+                if scores.get(key, 0) < score:
+                    scores[key] = score
+        return scores
+
+    def search(self, query: str, kinds: Optional[Set[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Trả về các tài liệu chứa tất cả các từ trong query (từ nào cũng có thể chỉ là tiền tố),
+        sắp xếp theo điểm giảm dần.
+        """
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens:
+            return []
+        with self._lock:
+            totals: Optional[Dict[Key, int]] = None
+            # Xét token ít kết quả trước để tập giao nhỏ nhanh
+            for matches in sorted((self._matches(token) for token in tokens), key=len):
+                if totals is None:
+                    totals = {key: score for key, score in matches.items() if kinds is None or key[0] in kinds}
+                else:
+                    totals = {key: score + matches[key] for key, score in totals.items() if key in matches}
+                if not totals:
+                    return []
+            ranked = sorted(totals.items(), key=lambda item: (-item[1], item[0][0], str(item[0][1])))
+            return [{"kind": key[0], **self._docs[key].record} for key, _ in ranked]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"documents": len(self._docs), "terms": len(self._terms)}
+
+
+class SearchSource:
+    """
+    Một nguồn dữ liệu của chỉ mục. load() trả về toàn bộ bản ghi (dict có 'id' và các trường trong fields);
+    nguồn được tải lại khi chưa có, khi bị đánh dấu stale hoặc sau max_age giây.
+    """
+
+    def __init__(
+        self,
+        kind: str,
+        load: Callable[[], Awaitable[List[Dict[str, Any]]]],
+        fields: Sequence[str],
+        max_age: float,
+    ):
+        self.kind = kind
+        self.load = load
+        self.fields = tuple(fields)
+        self.max_age = max_age
+        self.loaded_at: Optional[float] = None
+        self.stale = False
+        # Tăng mỗi khi có thay đổi theo dòng, để lần tải toàn bộ bắt đầu trước đó không ghi đè
+        self.generation = 0
+        self.loads = 0
+        self.updates = 0
+        self.load_errors = 0
+        self._lock = asyncio.Lock()
+
+    def _fresh(self) -> bool:
+        return (
+            self.loaded_at is not None
+            and not self.stale
+            and time.monotonic() - self.loaded_at < self.max_age
+        )
+
+    async def ensure_loaded(self) -> None:
+        if self._fresh():
+            return
+        async with self._lock:
+            if self._fresh():
+                return
+            generation = self.generation
+            self.stale = False
+            try:
+                records = await self.load()
+            except Exception as e:
+                # Giữ lại dữ liệu đã có trong chỉ mục (ví dụ WordPress tạm thời lỗi)
+                self.load_errors += 1
+                log.warning("search_source_failed", kind=self.kind, error=str(e) or type(e).__name__)
+                if self.loaded_at is None:
+                    raise
+                return
+            result = INDEX.replace(self.kind, records, self.fields)
+            self.loaded_at = time.monotonic()
+            self.loads += 1
+            if generation != self.generation:
+                self.stale = True
+            log.debug("search_source_loaded", kind=self.kind, documents=len(records), **result)
+
+    def apply(self, doc_id: Hashable, record: Optional[Dict[str, Any]]) -> None:
+        """
+        Cập nhật một tài liệu sau khi commit (record=None: đã xóa).
+        """
+        self.generation += 1
+        if self.loaded_at is None:
+            return
+        self.updates += 1
+        if record is None:
+            INDEX.remove(self.kind, doc_id)
+        else:
+            INDEX.upsert(self.kind, record, self.fields)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "kind": self.kind,
+            "loaded": self.loaded_at is not None,
+            "age": round(time.monotonic() - self.loaded_at, 1) if self.loaded_at is not None else None,
+            "stale": self.stale,
+            "loads": self.loads,
+            "updates": self.updates,
+            "load_errors": self.load_errors,
+        }
+
+
+INDEX = SearchIndex()
+SOURCES: Dict[str, SearchSource] = {}
+
+
+def register_source(
+    kind: str,
+    load: Callable[[], Awaitable[List[Dict[str, Any]]]],
+    fields: Sequence[str],
+    max_age: float,
+) -> SearchSource:
+    source = SearchSource(kind, load, fields, max_age)
+    SOURCES[kind] = source
+    return source
+
+
+def index_on_change(kind: str, model, record_fields: Sequence[str]) -> None:
+    """
+    Đăng ký để các dòng của model được cập nhật vào chỉ mục sau khi session commit,
+    chỉ đánh chỉ mục lại những dòng đã thay đổi. Nếu dòng không có sẵn đủ trường
+    (ví dụ được tải bằng load_only), nguồn được đánh dấu stale để tải lại toàn bộ.
+    """
+    source = SOURCES[kind]
+    info_key = "search_changes:" + kind
+
+    @event.listens_for(Session, "after_flush")
+    def _collect(session, flush_context):
+        changes = None
+        deleted = set(session.deleted)
+        for obj in list(session.new) + list(session.dirty) + list(deleted):
+            if not isinstance(obj, model):
+                continue
+            if changes is None:
+                changes = session.info.setdefault(info_key, {})
+            loaded = inspect(obj).dict
+            if obj in deleted:
+                changes[obj.id] = None
+            elif all(name in loaded for name in record_fields):
+                changes[obj.id] = {name: loaded[name] for name in record_fields}
+            else:
+                source.stale = True
+
+    @event.listens_for(Session, "after_commit")
+    def _apply(session):
+        for doc_id, record in session.info.pop(info_key, {}).items():
+            source.apply(doc_id, record)
+
+    @event.listens_for(Session, "after_rollback")
+    def _discard(session):
+        session.info.pop(info_key, None)
+
+
+def stats() -> Dict[str, Any]:
+    return {**INDEX.stats(), "sources": [source.stats() for source in SOURCES.values()]}
+
+
+@router.get("/search", summary="Tìm kiếm dịch vụ, tiện ích và loại phòng")
+async def search(
+    q: str = Query(..., min_length=1, max_length=100, description="Từ khóa, có dấu hoặc không dấu"),
+    kind: Optional[str] = Query(None, description="Giới hạn loại kết quả, ví dụ services,utilities,room_types"),
+    limit: int = Query(20, ge=1, le=100),
+):
+    """
+    Tìm kiếm không phân biệt dấu trên chỉ mục trong bộ nhớ; từ cuối (hoặc bất kỳ từ nào)
+    có thể chỉ là tiền tố, ví dụ "phong do" khớp "Phòng Đôi".
+    """
+    kinds = None
+    if kind:
+        kinds = {k.strip() for k in kind.split(",") if k.strip()}
+        unknown = sorted(kinds - set(SOURCES))
+        if unknown:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Loại không hợp lệ: {', '.join(unknown)}. Có thể chọn: {', '.join(SOURCES)}",
+            )
+
+    sources = [source for name, source in SOURCES.items() if kinds is None or name in kinds]
+    results = await asyncio.gather(*(source.ensure_loaded() for source in sources), return_exceptions=True)
+    failed = [source.kind for source, result in zip(sources, results) if isinstance(result, Exception)]
+    if failed and len(failed) == len(sources):
+        raise HTTPException(status_code=503, detail="Chưa tải được dữ liệu tìm kiếm.")
+
+    matches = INDEX.search(q, kinds)
+    response = {"query": q, "total": len(matches), "results": matches[:limit]}
+    if failed:
+        response["unavailable"] = failed
+    return response
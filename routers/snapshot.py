@@ -0,0 +1,147 @@
+# routers/snapshot.py
+import asyncio
+import hashlib
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from fastapi import Request, Response
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from .config import SNAPSHOT_MAX_AGE
+from .responses import dumps
+
+# Danh sách tất cả các snapshot đã tạo, dùng cho endpoint quản trị
+SNAPSHOTS: Dict[str, "ResponseSnapshot"] = {}
+
+
+class _Built:
+    __slots__ = ("body", "etag", "empty", "built_at")
+
+    def __init__(self, body: bytes, etag: str, empty: bool, built_at: float):
+        self.body = body
+        self.etag = etag
+        self.empty = empty
+        self.built_at = built_at
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == "*" or candidate == etag:
+            return True
+    return False
+
+
+class ResponseSnapshot:
+    """
+    Giữ sẵn một response JSON đã mã hóa (bytes) cùng ETag tính từ nội dung.
+    Snapshot được dựng lại khi bị invalidate (bảng thay đổi) hoặc sau SNAPSHOT_MAX_AGE giây
+    (phòng khi dữ liệu được sửa trực tiếp trong database).
+    """
+
+    def __init__(
+        self,
+        name: str,
+        build: Callable[[], Any],
+        max_age: float = SNAPSHOT_MAX_AGE,
+        abuild: Optional[Callable[[], Awaitable[Any]]] = None,
+    ):
+        self.name = name
+        self._build = build
+        self._abuild = abuild
+        self.max_age = max_age
+        self._built: Optional[_Built] = None
+        self._lock = threading.Lock()
+        self._alock = asyncio.Lock()
+        self._generation = 0
+        self.builds = 0
+        SNAPSHOTS[name] = self
+
+    def invalidate(self) -> None:
+        self._generation += 1
+        self._built = None
+
+    def _fresh(self) -> Optional[_Built]:
+        built = self._built
+        if built is not None and time.monotonic() - built.built_at < self.max_age:
+            return built
+        return None
+
+    def _store(self, data: Any, generation: int) -> _Built:
+        body = dumps(data)
+        built = _Built(
+            body=body,
+            etag='"' + hashlib.sha1(body).hexdigest() + '"',
+            empty=not data,
+            built_at=time.monotonic(),
+        )
+        self.builds += 1
+        if generation == self._generation:
+            self._built = built
+        return built
+
+    def get(self) -> _Built:
+        """
+        Lấy snapshot, dựng lại bằng hàm build đồng bộ nếu cần (chạy trong threadpool).
+        """
+        built = self._fresh()
+        if built is not None:
+            return built
+        # Chỉ một luồng dựng lại snapshot, các luồng khác chờ và dùng kết quả đó
+        with self._lock:
+            built = self._fresh()
+            if built is not None:
+                return built
+            generation = self._generation
+            return self._store(self._build(), generation)
+
+    async def aget(self) -> _Built:
+        """
+        Giống get() nhưng dựng lại bằng hàm build bất đồng bộ, chạy trên event loop.
+        """
+        built = self._fresh()
+        if built is not None:
+            return built
+        async with self._alock:
+            built = self._fresh()
+            if built is not None:
+                return built
+            generation = self._generation
+            return self._store(await self._abuild(), generation)
+
+    def respond(self, request: Request, built: Optional[_Built] = None) -> Response:
+        """
+        Trả về 304 nếu client đã có đúng phiên bản (If-None-Match), ngược lại trả về bytes đã mã hóa sẵn.
+        """
+        built = built or self.get()
+        headers = {"ETag": built.etag, "Cache-Control": "no-cache"}
+        if _etag_matches(request.headers.get("if-none-match"), built.etag):
+            return Response(status_code=304, headers=headers)
+        return Response(content=built.body, media_type="application/json", headers=headers)
+
+
+def invalidate_on_change(snapshot: ResponseSnapshot, *models) -> None:
+    """
+    Đăng ký để snapshot bị invalidate sau khi một session commit thay đổi trên các model đã cho.
+    """
+    @event.listens_for(Session, "after_flush")
+    def _collect(session, flush_context):
+        for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+            if isinstance(obj, models):
+                session.info.setdefault("changed_snapshots", set()).add(snapshot.name)
+
+    @event.listens_for(Session, "after_commit")
+    def _invalidate(session):
+        if snapshot.name in session.info.get("changed_snapshots", ()):
+            session.info["changed_snapshots"].discard(snapshot.name)
+            snapshot.invalidate()
+
+    @event.listens_for(Session, "after_rollback")
+    def _discard(session):
+        session.info.pop("changed_snapshots", None)
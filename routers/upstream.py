@@ -0,0 +1,305 @@
+# routers/upstream.py
+import asyncio
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Callable, Dict, Hashable, Optional
+
+# httpx chỉ được import khi tạo client (giảm thời gian import lúc cold start)
+if TYPE_CHECKING:
+    import httpx
+
+# Import các biến cấu hình từ file config.py
+from .config import (
+    WP_API_URL,
+    WP_CONSUMER_KEY,
+    WP_CONSUMER_SECRET,
+    WP_HTTP_MAX_CONNECTIONS,
+    WP_HTTP_MAX_KEEPALIVE,
+    WP_HTTP_KEEPALIVE_EXPIRY,
+    WP_HTTP2,
+    WP_TIMEOUT_DEFAULT,
+    WP_HEDGE_ROUTES,
+    WP_REVALIDATE,
+    WP_REVALIDATE_MAXSIZE,
+    ZALO_TIMEOUT,
+)
+from .metrics import observe_upstream
+from .resilience import get_breaker, get_latency, hedge_delay, timeout_for
+from .admission import upstream_slot
+
+# Client dùng chung cho toàn bộ ứng dụng, được tạo trong lifespan của app
+_client: Optional["httpx.AsyncClient"] = None
+# Client riêng cho Zalo Graph API (host khác, không dùng auth của WordPress)
+_zalo_client: Optional["httpx.AsyncClient"] = None
+
+
+class _Validated:
+    __slots__ = ("etag", "last_modified", "value")
+
+    def __init__(self, etag: Optional[str], last_modified: Optional[str], value: Any):
+        self.etag = etag
+        self.last_modified = last_modified
+        self.value = value
+
+
+# Validator và kết quả đã xử lý của các GET có điều kiện, theo (route, path, params) (LRU)
+_validated: "OrderedDict[Hashable, _Validated]" = OrderedDict()
+
+
+def _http2_available() -> bool:
+    """
+    HTTP/2 chỉ bật được khi gói 'h2' đã được cài đặt.
+    """
+    if not WP_HTTP2:
+        return False
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _build_client() -> "httpx.AsyncClient":
+    import httpx
+
+    limits = httpx.Limits(
+        max_connections=WP_HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=WP_HTTP_MAX_KEEPALIVE,
+        keepalive_expiry=WP_HTTP_KEEPALIVE_EXPIRY,
+    )
+    return httpx.AsyncClient(
+        base_url=WP_API_URL,
+        auth=(WP_CONSUMER_KEY, WP_CONSUMER_SECRET),
+        limits=limits,
+        timeout=WP_TIMEOUT_DEFAULT,
+        http2=_http2_available(),
+    )
+
+
+async def start_client() -> None:
+    """
+    Khởi tạo client dùng chung (gọi khi ứng dụng khởi động).
+    """
+    global _client
+    if _client is None:
+        _client = _build_client()
+
+
+def _build_zalo_client() -> "httpx.AsyncClient":
+    import httpx
+
+    return httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=WP_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=WP_HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=WP_HTTP_KEEPALIVE_EXPIRY,
+        ),
+        timeout=ZALO_TIMEOUT,
+        http2=_http2_available(),
+    )
+
+
+async def close_client() -> None:
+    """
+    Đóng các client và giải phóng các kết nối keep-alive (gọi khi ứng dụng tắt).
+    """
+    global _client, _zalo_client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+    if _zalo_client is not None:
+        await _zalo_client.aclose()
+        _zalo_client = None
+
+
+def get_client() -> "httpx.AsyncClient":
+    """
+    Trả về client dùng chung. Nếu lifespan chưa chạy (ví dụ môi trường serverless),
+    client sẽ được tạo ở lần gọi đầu tiên.
+    """
+    global _client
+    if _client is None:
+        _client = _build_client()
+    return _client
+
+
+def get_zalo_client() -> "httpx.AsyncClient":
+    """
+    Trả về client dùng chung cho Zalo Graph API (tạo ở lần gọi đầu tiên).
+    """
+    global _zalo_client
+    if _zalo_client is None:
+        _zalo_client = _build_zalo_client()
+    return _zalo_client
+
+
+async def _send(
+    method: str,
+    path: str,
+    route: str,
+    timeout: float,
+    params: Optional[Dict[str, Any]] = None,
+    json: Any = None,
+    headers: Optional[Dict[str, str]] = None,
+) -> "httpx.Response":
+    """
+    Một lời gọi tới WordPress: ghi metrics, độ trễ và kết quả cho circuit breaker của route.
+    Lỗi kết nối, timeout và 5xx tính là lỗi; 4xx là lỗi của request, không phải của upstream.
+    """
+    import httpx
+
+    breaker = get_breaker(route)
+    started = time.perf_counter()
+    try:
+        response = await get_client().request(
+            method, path, params=params, json=json, headers=headers, timeout=timeout
+        )
+    except asyncio.CancelledError:
+        # request dự phòng bị hủy vì request kia đã xong trước
+        observe_upstream("wordpress", route, "cancelled", time.perf_counter() - started)
+        raise
+    except Exception as e:
+        elapsed = time.perf_counter() - started
+        observe_upstream("wordpress", route, "error", elapsed)
+        if isinstance(e, httpx.TimeoutException):
+            get_latency(route).record(elapsed)
+        breaker.record_failure()
+        raise
+
+    elapsed = time.perf_counter() - started
+    observe_upstream("wordpress", route, str(response.status_code), elapsed)
+    get_latency(route).record(elapsed)
+    if response.status_code >= 500:
+        breaker.record_failure()
+    else:
+        breaker.record_success()
+    return response
+
+
+async def _hedged_get(
+    path: str,
+    route: str,
+    timeout: float,
+    params: Optional[Dict[str, Any]],
+    headers: Optional[Dict[str, str]] = None,
+) -> "httpx.Response":
+    """
+    Gửi GET; nếu chưa có phản hồi sau hedge_delay(route) thì gửi thêm một request giống hệt
+    và dùng phản hồi thành công đến trước, request còn lại bị hủy.
+    """
+    first = asyncio.ensure_future(_send("GET", path, route, timeout, params=params, headers=headers))
+    done, _ = await asyncio.wait({first}, timeout=hedge_delay(route))
+    if done:
+        return first.result()
+
+    tracker = get_latency(route)
+    tracker.hedges += 1
+    second = asyncio.ensure_future(_send("GET", path, route, timeout, params=params, headers=headers))
+    pending = {first, second}
+    last = first
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                last = task
+                if task.exception() is None and task.result().status_code < 500:
+                    if task is second:
+                        tracker.hedge_wins += 1
+                    return task.result()
+        # cả hai đều lỗi: trả về kết quả (hoặc ném lỗi) của request xong sau cùng
+        return last.result()
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def wp_request(
+    method: str,
+    path: str,
+    route: str,
+    params: Optional[Dict[str, Any]] = None,
+    json: Any = None,
+    headers: Optional[Dict[str, str]] = None,
+) -> "httpx.Response":
+    """
+    Gửi một yêu cầu tới WordPress MPHB API qua client dùng chung.
+    'route' là tên endpoint, dùng để chọn circuit breaker, timeout (WP_TIMEOUTS hoặc thích ứng)
+    và bật hedged request (WP_HEDGE_ROUTES, chỉ cho GET).
+    Khi circuit breaker của route đang mở, ném UpstreamUnavailable (503) ngay; khi đã có quá nhiều
+    lời gọi upstream đồng thời, chờ đến lượt (ADMISSION_UPSTREAM_CONCURRENCY).
+    """
+    get_breaker(route).check()
+    async with upstream_slot():
+        timeout = timeout_for(route)
+        if method == "GET" and route in WP_HEDGE_ROUTES:
+            return await _hedged_get(path, route, timeout, params, headers=headers)
+        return await _send(method, path, route, timeout, params=params, json=json, headers=headers)
+
+
+async def zalo_get(url: str, headers: Dict[str, str]) -> "httpx.Response":
+    """
+    Gửi yêu cầu GET tới Zalo Graph API qua client dùng chung.
+    """
+    async with upstream_slot():
+        started = time.perf_counter()
+        status = "error"
+        try:
+            response = await get_zalo_client().get(url, headers=headers)
+            status = str(response.status_code)
+            return response
+        finally:
+            observe_upstream("zalo", "graph_me_info", status, time.perf_counter() - started)
+
+
+async def wp_get(path: str, route: str, params: Optional[Dict[str, Any]] = None) -> "httpx.Response":
+    return await wp_request("GET", path, route, params=params)
+
+
+async def wp_get_revalidated(
+    path: str,
+    route: str,
+    process: Callable[["httpx.Response"], Any],
+    params: Optional[Dict[str, Any]] = None,
+    not_modified: Optional[Callable[[Any, "httpx.Response"], None]] = None,
+) -> Any:
+    """
+    GET có điều kiện: trả về process(response) và lưu kết quả đó cùng ETag/Last-Modified của response.
+    Lần gọi sau gửi If-None-Match/If-Modified-Since; nếu WordPress trả về 304 thì trả lại kết quả
+    đã xử lý lần trước mà không tải và xử lý lại nội dung. process() tự xử lý các mã lỗi (ném HTTPException).
+    not_modified(kết quả đã lưu, response 304) cho phép cập nhật phần lấy từ header (ví dụ X-WP-TotalPages).
+    """
+    if not WP_REVALIDATE:
+        return process(await wp_get(path, route, params=params))
+
+    key = (route, path, tuple(sorted((params or {}).items())))
+    stored = _validated.get(key)
+    headers = {}
+    if stored is not None:
+        if stored.etag:
+            headers["If-None-Match"] = stored.etag
+        if stored.last_modified:
+            headers["If-Modified-Since"] = stored.last_modified
+        get_latency(route).revalidations += 1
+
+    response = await wp_request("GET", path, route, params=params, headers=headers or None)
+    if response.status_code == 304 and stored is not None:
+        get_latency(route).not_modified += 1
+        _validated.move_to_end(key)
+        if not_modified is not None:
+            not_modified(stored.value, response)
+        return stored.value
+
+    value = process(response)
+    etag, last_modified = response.headers.get("ETag"), response.headers.get("Last-Modified")
+    if response.status_code == 200 and (etag or last_modified):
+        _validated[key] = _Validated(etag, last_modified, value)
+        _validated.move_to_end(key)
+        while len(_validated) > WP_REVALIDATE_MAXSIZE:
+            _validated.popitem(last=False)
+    else:
+        _validated.pop(key, None)
+    return value
+
+
+async def wp_post(path: str, route: str, json: Any = None) -> "httpx.Response":
+    return await wp_request("POST", path, route, json=json)
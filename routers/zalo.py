@@ -1,55 +1,33 @@
 # routers/zalo.py
-from fastapi import APIRouter, HTTPException, Request
-from pydantic import BaseModel, ValidationError
-import requests
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel
+import hashlib
 import os
-import json
 from typing import Dict
 
+from .config import ZALO_GRAPH_URL
+from .upstream import zalo_get
+from .cache import zalo_phone_cache
+from .resilience import UpstreamUnavailable
+from .logger import get_logger
+
 ZALO_APP_ID = os.environ.get("ZALO_APP_ID")
 ZALO_APP_SECRET = os.environ.get("ZALO_APP_SECRET")
 
 
 router = APIRouter()
+log = get_logger("zalo")
 
 
 class ZaloPhoneRequest(BaseModel):
     token: str           # token frontend gửi về sau khi gọi getPhoneNumber()
     access_token: str    # access_token từ OA SDK (frontend lấy bằng getAccessToken)
 
-@router.post("/get-phone-number")
-async def get_phone_number_from_token(request: Request):
+
+async def _exchange_phone_number(access_token: str, token: str) -> Dict[str, str]:
     """
-    Nhận token từ frontend, validate, gọi Zalo Graph API để đổi token -> số điện thoại.
+    Gọi Zalo Graph API để đổi token -> số điện thoại (không chặn event loop).
     """
-    # 1) đọc raw body và log (giúp debug 422)
-    try:
-        body = await request.json()
-    except Exception as e:
-        # không phải JSON
-        raise HTTPException(status_code=400, detail=f"Invalid JSON body: {str(e)}")
-
-    print("📩 /api/get-phone-number raw body:", body)
-
-    # 2) kiểm tra env
-    if not all([ZALO_APP_ID, ZALO_APP_SECRET]):
-        raise HTTPException(status_code=500, detail="Missing Zalo API configuration (ZALO_APP_ID/ZALO_APP_SECRET)")
-
-    # 3) validate body với Pydantic (nếu sai sẽ trả 422 với detail rõ ràng)
-    try:
-        req = ZaloPhoneRequest(**body)
-    except ValidationError as ve:
-        # in ra log để dev dễ debug
-        print("⚠️ Validation error:", ve.json())
-        # trả về 422 với chi tiết validation
-        # (FastAPI mặc định làm điều này nếu dùng model param; ở đây ta custom để log)
-        raise HTTPException(status_code=422, detail=json.loads(ve.json()))
-
-    token = req.token
-    access_token = req.access_token
-
-    # 4) gọi Zalo Graph API để đổi token -> phone number
-    endpoint = "https://graph.zalo.me/v2.0/me/info"
     headers: Dict[str, str] = {
         # Theo docs Zalo: gửi access_token, code, secret_key trong header
         "access_token": access_token,
@@ -58,8 +36,10 @@ async def get_phone_number_from_token(request: Request):
     }
 
     try:
-        resp = requests.get(endpoint, headers=headers, timeout=10)
-    except requests.RequestException as e:
+        resp = await zalo_get(ZALO_GRAPH_URL, headers=headers)
+    except UpstreamUnavailable:
+        raise
+    except Exception as e:
         raise HTTPException(status_code=502, detail=f"Error calling Zalo Graph API: {str(e)}")
 
     try:
@@ -67,9 +47,9 @@ async def get_phone_number_from_token(request: Request):
     except Exception:
         raise HTTPException(status_code=502, detail=f"Zalo response not JSON (status {resp.status_code})")
 
-    print("🔁 Zalo Graph API response:", resp.status_code, resp_json)
+    # số điện thoại và token được che trong log
+    log.info("zalo_graph_response", route="get_phone_number", status=resp.status_code, body=resp_json)
 
-    # 5) xử lý response
     # theo docs: trả về {"data": {"number": "849..."}, "error": 0, ...}
     if resp.status_code == 200 and isinstance(resp_json, dict):
         data = resp_json.get("data", {})
@@ -81,3 +61,24 @@ async def get_phone_number_from_token(request: Request):
     else:
         # chuyển lỗi Zalo về client để debug
         raise HTTPException(status_code=resp.status_code or 502, detail=resp_json)
+
+
+@router.post("/get-phone-number")
+async def get_phone_number_from_token(req: ZaloPhoneRequest):
+    """
+    Nhận token từ frontend (body được validate bởi ZaloPhoneRequest, sai sẽ trả 422),
+    gọi Zalo Graph API để đổi token -> số điện thoại.
+    Các lần đổi giống nhau đang chạy đồng thời chỉ gọi Zalo một lần, và kết quả thành công
+    được cache trong thời gian ngắn vì mini-app hay gửi lại.
+    """
+    # 1) kiểm tra env
+    if not all([ZALO_APP_ID, ZALO_APP_SECRET]):
+        raise HTTPException(status_code=500, detail="Missing Zalo API configuration (ZALO_APP_ID/ZALO_APP_SECRET)")
+
+    # 2) key cache là hash của cặp token, để không giữ token gốc trong bộ nhớ
+    key = hashlib.sha256(f"{req.access_token}\0{req.token}".encode("utf-8")).hexdigest()
+
+    # 3) gọi Zalo Graph API (hoặc dùng kết quả đã có)
+    return await zalo_phone_cache.get_or_load(
+        key, lambda: _exchange_phone_number(req.access_token, req.token)
+    )